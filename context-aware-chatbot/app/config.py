@@ -1,24 +1,47 @@
 """
 Configuration module for the RAG chatbot.
-Loads settings from environment variables with sensible defaults.
+Loads settings from environment variables and a .env file with sensible defaults.
 """
 
+import os
 from functools import lru_cache
-from typing import Optional
+from pathlib import Path
+from typing import Any, get_origin
 
-from pydantic_settings import BaseSettings
+import msgspec
 
+ENV_FILE = ".env"
 
-class Settings(BaseSettings):
+
+class Settings(msgspec.Struct, frozen=True):
     """Application configuration settings loaded from environment."""
     
     # LLM Configuration
     ollama_base_url: str = "http://localhost:11434"
     ollama_model: str = "llama3.2:3b"  # Faster, lighter model (3B parameters vs 7B+)
     ollama_timeout: int = 300  # Increased to 5 minutes for model loading
+    ollama_keep_alive: int = 1800  # Seconds Ollama keeps the model and its prompt cache loaded; -1 for always
     
     # Embedding Model
     embedding_model: str = "all-MiniLM-L6-v2"
+    embedding_batch_size: int = 64  # Texts per encode call during ingestion
+    embedding_device: str = ""  # e.g. "cpu" or "cuda"; empty picks automatically
+    embedding_max_seq_length: int = 0  # Truncate inputs to this many tokens; 0 keeps the model's limit
+    embedding_threads: int = 0  # Torch intra-op threads; 0 keeps torch's default
+    query_batch_wait_ms: float = 5.0  # Gather concurrent query embeddings this long; 0 disables
+    query_batch_size: int = 32  # Most queries embedded in one batch
+    embedding_backend: str = "torch"  # "torch", "onnx" or "openvino"
+    embedding_onnx_file: str = ""  # e.g. "onnx/model_O4.onnx"; empty uses the default export
+    embedding_onnx_provider: str = "CPUExecutionProvider"
+    onnx_cache_dir: str = ""  # Where exported models are cached; empty uses the HF cache
+    quantize_encoder: bool = False  # Dynamic int8 Linear layers (torch backend, CPU only)
+    embedding_compile: bool = False  # fp16 + torch.compile with CUDA graphs (torch backend, CUDA only)
+    embedding_cache_enabled: bool = True  # Reuse vectors for previously seen chunks
+    embedding_cache_path: str = "./embedding_cache/embeddings.sqlite3"
+    
+    # Vector Store Configuration
+    vector_backend: str = "chroma"  # "chroma" or "faiss" (needs faiss-cpu)
+    faiss_index_type: str = "hnsw_sq8"  # "hnsw_flat", "hnsw_sq8" or "hnsw_pq" for very large corpora
     
     # ChromaDB Configuration
     chroma_persist_dir: str = "./chroma_db"
@@ -26,25 +49,109 @@ class Settings(BaseSettings):
     
     # Retrieval Settings
     retrieval_top_k: int = 3  # Reduced from 5 for faster processing
+    retrieval_mmr: bool = False  # Rerank with MMR to skip near-duplicate chunks
+    retrieval_mmr_lambda: float = 0.7  # 1.0 = pure relevance, 0.0 = pure diversity
+    retrieval_fetch_k: int = 20  # Candidates considered by MMR
+    int8_search: bool = False  # Score candidates on an int8 copy of the embeddings
+    int8_candidates: int = 50  # Candidates rescored in float32 per query
     chunk_size: int = 1000
     chunk_overlap: int = 200
     
+    # Caching
+    semantic_cache_enabled: bool = True
+    semantic_cache_threshold: float = 0.95  # Cosine similarity for a cache hit
+    semantic_cache_size: int = 256
+    semantic_cache_int8: bool = False  # Store cached query embeddings as int8 (4x smaller)
+    exact_cache_enabled: bool = True  # Memoize identical prompts sent to Ollama
+    exact_cache_size: int = 512
+    search_cache_enabled: bool = True  # Reuse retrieval results for near-identical queries
+    search_cache_size: int = 1024
+    search_cache_ttl: float = 300.0  # Seconds; bounds staleness when other workers ingest
+    chat_cache_enabled: bool = True  # Replay answers to repeated questions in the Chainlit UI
+    chat_cache_size: int = 1024
+    chat_cache_ttl: float = 600.0  # Seconds; ingestion in the API process can't clear it
+    chat_cache_persist: bool = True  # Keep chat answers on disk across restarts
+    chat_cache_path: str = "./chat_cache/responses.sqlite3"
+    
     # API Configuration
     api_host: str = "0.0.0.0"
     api_port: int = 8000
+    workers: int = max(2, os.cpu_count() or 1)  # Each worker loads its own embedding model
+    health_cache_ttl: float = 3.0  # Seconds to reuse a /health result
+    cors_origins: list[str] = msgspec.field(
+        default_factory=lambda: ["http://localhost:3000", "http://localhost:8000"]
+    )
     
     # Logging
     log_level: str = "INFO"
+
+
+def _read_env_file(path: Path) -> dict[str, str]:
+    """
+    Parse KEY=VALUE lines from a dotenv file.
+    
+    Args:
+        path: Path to the .env file.
+        
+    Returns:
+        Mapping of lowercased keys to raw string values.
+    """
+    if not path.is_file():
+        return {}
+        
+    values = {}
+    
+    for line in path.read_text(encoding="utf-8").splitlines():
+        line = line.strip()
+        if not line or line.startswith("#") or "=" not in line:
+            continue
+            
+        key, _, value = line.partition("=")
+        key = key.strip().removeprefix("export ").strip()
+        value = value.strip()
+        
+        if len(value) >= 2 and value[0] == value[-1] and value[0] in "\"'":
+            value = value[1:-1]
+        else:
+            value = value.split(" #", 1)[0].rstrip()
+            
+        values[key.lower()] = value
+        
+    return values
+
+
+def _load_settings() -> Settings:
+    """
+    Build settings from the .env file overlaid with environment variables.
+    
+    Environment variables take precedence, keys are case-insensitive, and
+    list values are given as JSON (e.g. CORS_ORIGINS=["http://a","http://b"]).
+    """
+    field_types = {field.name: field.type for field in msgspec.structs.fields(Settings)}
+    
+    raw = _read_env_file(Path(ENV_FILE))
+    raw.update(
+        (key.lower(), value)
+        for key, value in os.environ.items()
+        if key.lower() in field_types
+    )
     
-    class Config:
-        env_file = ".env"
-        env_file_encoding = "utf-8"
+    data: dict[str, Any] = {}
+    for name, value in raw.items():
+        if name not in field_types:
+            continue
+        if get_origin(field_types[name]) in (list, dict):
+            value = msgspec.json.decode(value)
+        data[name] = value
+        
+    # strict=False coerces strings like "8000" and "true" to the field types
+    return msgspec.convert(data, Settings, strict=False)
 
 
-@lru_cache()
+@lru_cache(maxsize=1)
 def get_settings() -> Settings:
     """
     Get cached settings instance.
     Uses lru_cache to avoid reloading env vars on every call.
     """
-    return Settings()
+    return _load_settings()
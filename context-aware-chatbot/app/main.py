@@ -3,23 +3,83 @@ FastAPI application entry point.
 Sets up the API server with all routes and middleware.
 """
 
+import asyncio
+import hashlib
+import time
 from contextlib import asynccontextmanager
-from datetime import datetime
+from pathlib import Path
+from typing import Optional
 
-from fastapi import FastAPI
+import httpx
+from fastapi import FastAPI, Request
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import JSONResponse, HTMLResponse, FileResponse
+from fastapi.responses import HTMLResponse, ORJSONResponse, Response
+from fastapi.staticfiles import StaticFiles
 
 from app import __version__
 from app.config import get_settings
 from app.models.schemas import HealthResponse
 from app.routers import ingest_router, query_router
+from app.services.singletons import get_ollama_client, get_rag_pipeline, get_vector_store
 from app.utils.logging import get_logger, setup_logging
+from app.utils.middleware import RequestIdMiddleware, SelectiveGZipMiddleware
 
 # Initialize logging
 setup_logging()
 logger = get_logger(__name__)
 
+STATIC_DIR = Path(__file__).parent / "static"
+
+# Liveness probes must fail fast even though the shared Ollama client
+# allows long generation timeouts
+_PROBE_TIMEOUT = 5.0
+
+# Chat page is read and hashed once; every hit reuses the same bytes
+_INDEX_HTML_BYTES = (STATIC_DIR / "index.html").read_bytes()
+_INDEX_ETAG = f'"{hashlib.md5(_INDEX_HTML_BYTES).hexdigest()}"'
+_INDEX_HEADERS = {
+    "ETag": _INDEX_ETAG,
+    "Cache-Control": "public, max-age=300",
+}
+
+
+async def wait_for_ollama(client: httpx.AsyncClient, timeout: float) -> None:
+    """
+    Wait until Ollama answers on /api/tags.
+    
+    Retries with exponential backoff until the timeout elapses.
+    
+    Args:
+        client: HTTP client with the Ollama base URL configured.
+        timeout: Maximum time to wait in seconds.
+        
+    Raises:
+        RuntimeError: If Ollama is still unreachable after the timeout.
+    """
+    loop = asyncio.get_running_loop()
+    deadline = loop.time() + timeout
+    delay = 0.5
+    last_error = "no response"
+    
+    while True:
+        try:
+            response = await client.get("/api/tags", timeout=_PROBE_TIMEOUT)
+            if response.status_code == 200:
+                return
+            last_error = f"status {response.status_code}"
+        except httpx.HTTPError as e:
+            last_error = str(e)
+            
+        remaining = deadline - loop.time()
+        if remaining <= 0:
+            raise RuntimeError(
+                f"Ollama not reachable at {client.base_url} after {timeout}s: {last_error}"
+            )
+            
+        logger.info("waiting_for_ollama", retry_in=delay, error=last_error)
+        await asyncio.sleep(min(delay, remaining))
+        delay = min(delay * 2, 10.0)
+
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
@@ -29,40 +89,42 @@ async def lifespan(app: FastAPI):
     """
     # Startup
     logger.info("application_starting", version=__version__)
+    settings = get_settings()
     
-    # Pre-initialize services to fail fast if there are issues
+    # Shared keep-alive client for Ollama, reused by health probes and RAG
+    app.state.ollama = get_ollama_client()
+    
+    # Warm up every service before accepting traffic, so the first query
+    # doesn't pay for model loading or Ollama connection setup
     try:
-        from app.services.vector_store import VectorStoreService
-        from app.services.rag_pipeline import RAGPipeline
-        
-        # Initialize vector store
-        vector_store = VectorStoreService()
+        # Initialize vector store and load the embedding weights
+        vector_store = get_vector_store()
+        vector_store.generate_embeddings(["warmup"])
         logger.info(
             "vector_store_ready",
-            document_count=vector_store.collection.count(),
+            document_count=vector_store.count(),
         )
         
-        # Initialize RAG pipeline
-        # Note: This will fail if Ollama is not running
-        # We'll handle this gracefully
-        try:
-            rag = RAGPipeline()
-            logger.info("rag_pipeline_ready")
-        except Exception as e:
-            logger.warning(
-                "rag_pipeline_init_warning",
-                error=str(e),
-                message="RAG pipeline will initialize on first query",
-            )
+        # Make sure the LLM backend is up before building the pipeline
+        await wait_for_ollama(app.state.ollama, settings.ollama_timeout)
+        
+        get_rag_pipeline()
+        logger.info("rag_pipeline_ready")
             
     except Exception as e:
         logger.error("startup_error", error=str(e))
+        await app.state.ollama.aclose()
+        get_ollama_client.cache_clear()
         raise
         
     yield
     
     # Shutdown
     logger.info("application_shutting_down")
+    get_vector_store().persist()
+    await get_rag_pipeline().aclose()
+    await app.state.ollama.aclose()
+    get_ollama_client.cache_clear()
 
 
 # Create FastAPI application
@@ -89,22 +151,41 @@ app = FastAPI(
     This API requires Ollama to be running locally with a compatible model.
     """,
     version=__version__,
+    default_response_class=ORJSONResponse,
     lifespan=lifespan,
 )
 
 # Add CORS middleware for frontend integration
+# An explicit allowlist lets non-CORS requests skip header handling, and
+# max_age lets browsers cache preflight results for a day
 app.add_middleware(
     CORSMiddleware,
-    allow_origins=["*"],  # In production, restrict this to your domains
+    allow_origins=get_settings().cors_origins,
     allow_credentials=True,
-    allow_methods=["*"],
-    allow_headers=["*"],
+    allow_methods=["GET", "POST", "DELETE"],
+    allow_headers=["content-type"],
+    max_age=86400,
+)
+
+# Compress responses; the chat page and source snippets are plain text.
+# Level 5 balances ratio against CPU for interactive responses.
+app.add_middleware(
+    SelectiveGZipMiddleware,
+    minimum_size=512,
+    compresslevel=5,
+    exclude_paths=("/query/stream",),
 )
 
+# Tag every log line with a per-request ID (outermost, so it covers all)
+app.add_middleware(RequestIdMiddleware)
+
 # Include routers
 app.include_router(ingest_router)
 app.include_router(query_router)
 
+# Static assets for the chat interface
+app.mount("/static", StaticFiles(directory=STATIC_DIR), name="static")
+
 
 @app.get(
     "/",
@@ -112,266 +193,41 @@ app.include_router(query_router)
     summary="Chat Interface",
     description="Web interface for the RAG chatbot.",
 )
-async def root():
-    """Serve the chat interface."""
-    html_content = """
-<!DOCTYPE html>
-<html lang="en">
-<head>
-    <meta charset="UTF-8">
-    <meta name="viewport" content="width=device-width, initial-scale=1.0">
-    <title>RAG Chatbot - Company Knowledge Assistant</title>
-    <style>
-        * { box-sizing: border-box; }
-        body {
-            font-family: -apple-system, BlinkMacSystemFont, 'Segoe UI', Arial, sans-serif;
-            max-width: 900px;
-            margin: 0 auto;
-            padding: 20px;
-            background: linear-gradient(135deg, #667eea 0%, #764ba2 100%);
-            min-height: 100vh;
-        }
-        .container {
-            background: white;
-            padding: 40px;
-            border-radius: 15px;
-            box-shadow: 0 10px 40px rgba(0,0,0,0.2);
-        }
-        h1 {
-            color: #333;
-            margin-bottom: 10px;
-            font-size: 2em;
-        }
-        .subtitle {
-            color: #666;
-            margin-bottom: 30px;
-            font-size: 1.1em;
-        }
-        .input-group {
-            margin-bottom: 20px;
-        }
-        input[type="text"] {
-            width: 100%;
-            padding: 15px;
-            border: 2px solid #ddd;
-            border-radius: 8px;
-            font-size: 16px;
-            transition: border-color 0.3s;
-        }
-        input[type="text"]:focus {
-            outline: none;
-            border-color: #667eea;
-        }
-        button {
-            background: linear-gradient(135deg, #667eea 0%, #764ba2 100%);
-            color: white;
-            padding: 15px 40px;
-            border: none;
-            border-radius: 8px;
-            cursor: pointer;
-            font-size: 16px;
-            font-weight: bold;
-            transition: transform 0.2s, box-shadow 0.2s;
-            margin-right: 10px;
-        }
-        button:hover {
-            transform: translateY(-2px);
-            box-shadow: 0 5px 15px rgba(102, 126, 234, 0.4);
-        }
-        button:disabled {
-            background: #ccc;
-            cursor: not-allowed;
-            transform: none;
-        }
-        .response {
-            margin-top: 30px;
-            padding: 25px;
-            background: #f8f9fa;
-            border-radius: 10px;
-            border-left: 4px solid #667eea;
-            display: none;
-        }
-        .response.show {
-            display: block;
-        }
-        .answer {
-            margin-bottom: 20px;
-            line-height: 1.8;
-            color: #333;
-            font-size: 16px;
-        }
-        .sources {
-            margin-top: 25px;
-            padding-top: 25px;
-            border-top: 2px solid #e0e0e0;
-        }
-        .sources h3 {
-            color: #333;
-            margin-bottom: 15px;
-        }
-        .source {
-            background: white;
-            padding: 15px;
-            margin-bottom: 12px;
-            border-radius: 8px;
-            border-left: 3px solid #667eea;
-            box-shadow: 0 2px 5px rgba(0,0,0,0.05);
-        }
-        .source-title {
-            font-weight: bold;
-            color: #667eea;
-            margin-bottom: 8px;
-        }
-        .source-content {
-            color: #666;
-            font-size: 14px;
-            margin-top: 8px;
-            line-height: 1.6;
-        }
-        .source-score {
-            color: #999;
-            font-size: 12px;
-            margin-top: 8px;
-        }
-        .loading {
-            color: #667eea;
-            font-style: italic;
-            text-align: center;
-            padding: 20px;
-        }
-        .error {
-            color: #d32f2f;
-            background: #ffebee;
-            padding: 15px;
-            border-radius: 8px;
-            border-left: 4px solid #d32f2f;
-        }
-        .query-time {
-            margin-top: 15px;
-            color: #999;
-            font-size: 12px;
-            text-align: right;
-        }
-    </style>
-</head>
-<body>
-    <div class="container">
-        <h1>RAG Chatbot</h1>
-        <p class="subtitle">Ask questions about your company documentation</p>
-        
-        <div class="input-group">
-            <input type="text" id="question" placeholder="e.g., What is the remote work policy? How do I request time off?" 
-                   onkeypress="if(event.key === 'Enter' && !document.getElementById('askBtn').disabled) askQuestion()">
-        </div>
-        
-        <button id="askBtn" onclick="askQuestion()">Ask Question</button>
-        <button onclick="clearResponse()">Clear</button>
+async def root(request: Request) -> Response:
+    """Serve the chat interface, answering 304 if the browser copy is current."""
+    if request.headers.get("if-none-match") == _INDEX_ETAG:
+        return Response(status_code=304, headers=_INDEX_HEADERS)
         
-        <div id="response" class="response"></div>
-    </div>
+    return Response(
+        content=_INDEX_HTML_BYTES,
+        media_type="text/html",
+        headers=_INDEX_HEADERS,
+    )
 
-    <script>
-        async function askQuestion() {
-            const question = document.getElementById('question').value.trim();
-            if (!question) {
-                alert('Please enter a question!');
-                return;
-            }
-            
-            const responseDiv = document.getElementById('response');
-            const askBtn = document.getElementById('askBtn');
-            
-            responseDiv.className = 'response show';
-            responseDiv.innerHTML = '<div class="loading">⏳ Processing your question... This may take 10-30 seconds.</div>';
-            askBtn.disabled = true;
-            
-            try {
-                const response = await fetch('/query', {
-                    method: 'POST',
-                    headers: {
-                        'Content-Type': 'application/json',
-                    },
-                    body: JSON.stringify({
-                        question: question,
-                        top_k: 5,
-                        include_sources: true
-                    })
-                });
-                
-                if (!response.ok) {
-                    throw new Error(`HTTP error! status: ${response.status}`);
-                }
-                
-                const data = await response.json();
-                
-                let html = '<div class="response show">';
-                html += '<h3>Answer:</h3>';
-                html += '<div class="answer">' + data.answer.replace(/\\n/g, '<br>') + '</div>';
-                
-                if (data.sources && data.sources.length > 0) {
-                    html += '<div class="sources"><h3>📚 Sources (' + data.sources.length + '):</h3>';
-                    data.sources.forEach((source, index) => {
-                        const sourceName = source.title || source.source.split(/[/\\\\]/).pop();
-                        html += '<div class="source">';
-                        html += '<div class="source-title">Source ' + (index + 1) + ': ' + sourceName + '</div>';
-                        html += '<div class="source-content">' + source.content.substring(0, 250) + (source.content.length > 250 ? '...' : '') + '</div>';
-                        html += '<div class="source-score">Relevance: ' + (source.relevance_score * 100).toFixed(1) + '%</div>';
-                        html += '</div>';
-                    });
-                    html += '</div>';
-                }
-                
-                if (data.query_time_ms) {
-                    html += '<div class="query-time">Query processed in ' + (data.query_time_ms / 1000).toFixed(2) + ' seconds</div>';
-                }
-                
-                html += '</div>';
-                
-                responseDiv.innerHTML = html;
-                
-            } catch (error) {
-                responseDiv.innerHTML = '<div class="error"><strong>Error:</strong> ' + error.message + '<br><br>Make sure the API server is running and Ollama is available.</div>';
-            } finally {
-                askBtn.disabled = false;
-            }
-        }
-        
-        function clearResponse() {
-            const responseDiv = document.getElementById('response');
-            responseDiv.className = 'response';
-            responseDiv.innerHTML = '';
-            document.getElementById('question').value = '';
-        }
-    </script>
-</body>
-</html>
-    """
-    return HTMLResponse(content=html_content)
 
+# Last computed health status and when it was computed (monotonic clock)
+_health_cache: Optional[tuple[float, HealthResponse]] = None
+_health_refresh: Optional[asyncio.Task] = None
 
-@app.get(
-    "/health",
-    response_model=HealthResponse,
-    summary="Health check",
-    description="Check the health of the API and its components.",
-)
-async def health_check() -> HealthResponse:
+
+async def _check_health(app: FastAPI) -> HealthResponse:
     """
-    Health check endpoint.
+    Check every component and cache the result.
     
     Returns the status of all components:
     - API: Always healthy if this endpoint responds
     - Vector Store: Checks ChromaDB connection
     - LLM: Checks Ollama availability
     """
+    global _health_cache
+    
     components = {"api": "healthy"}
     overall_status = "healthy"
     
     # Check vector store
     try:
-        from app.services.vector_store import VectorStoreService
-        vs = VectorStoreService()
-        vs.collection.count()
+        # Queries the store, unlike the kept count, so it runs off the loop
+        await asyncio.to_thread(get_vector_store().count, exact=True)
         components["vector_store"] = "healthy"
     except Exception as e:
         components["vector_store"] = f"unhealthy: {str(e)}"
@@ -379,9 +235,7 @@ async def health_check() -> HealthResponse:
         
     # Check LLM
     try:
-        import httpx
-        settings = get_settings()
-        response = httpx.get(f"{settings.ollama_base_url}/api/tags", timeout=5)
+        response = await app.state.ollama.get("/api/tags", timeout=_PROBE_TIMEOUT)
         if response.status_code == 200:
             components["llm"] = "healthy"
         else:
@@ -391,12 +245,50 @@ async def health_check() -> HealthResponse:
         components["llm"] = f"unhealthy: {str(e)}"
         overall_status = "degraded"
         
-    return HealthResponse(
+    health = HealthResponse(
         status=overall_status,
-        timestamp=datetime.utcnow(),
         version=__version__,
         components=components,
     )
+    _health_cache = (time.monotonic(), health)
+    
+    return health
+
+
+@app.get(
+    "/health",
+    response_model=HealthResponse,
+    summary="Health check",
+    description="Check the health of the API and its components.",
+)
+async def health_check(request: Request) -> HealthResponse:
+    """
+    Health check endpoint.
+    
+    Results are cached for HEALTH_CACHE_TTL seconds so frequent probes
+    don't each hit ChromaDB and Ollama. Once expired, the stale result
+    is served while a single background check refreshes it; results
+    older than ten times the TTL are recomputed inline.
+    """
+    global _health_refresh
+    
+    if _health_cache is None:
+        return await _check_health(request.app)
+        
+    checked_at, health = _health_cache
+    age = time.monotonic() - checked_at
+    ttl = get_settings().health_cache_ttl
+    
+    if age < ttl:
+        return health
+        
+    if age >= ttl * 10:
+        return await _check_health(request.app)
+        
+    if _health_refresh is None or _health_refresh.done():
+        _health_refresh = asyncio.create_task(_check_health(request.app))
+        
+    return health
 
 
 # Error handlers
@@ -408,7 +300,7 @@ async def global_exception_handler(request, exc):
         error=str(exc),
         path=request.url.path,
     )
-    return JSONResponse(
+    return ORJSONResponse(
         status_code=500,
         content={
             "error": "Internal server error",
@@ -418,6 +310,8 @@ async def global_exception_handler(request, exc):
 
 
 if __name__ == "__main__":
+    import sys
+    
     import uvicorn
     
     settings = get_settings()
@@ -425,5 +319,9 @@ if __name__ == "__main__":
         "app.main:app",
         host=settings.api_host,
         port=settings.api_port,
-        reload=True,
+        workers=settings.workers,
+        loop="asyncio" if sys.platform == "win32" else "uvloop",  # uvloop has no Windows build
+        http="httptools",
+        backlog=2048,
+        log_config=None,  # Logging is configured by setup_logging()
     )
@@ -8,6 +8,11 @@ from app.models.schemas import (
     SourceDocument,
     HealthResponse,
 )
+from app.models.fast_schemas import (
+    MsgspecJSONResponse,
+    QueryResponseFast,
+    SourceDocumentFast,
+)
 
 __all__ = [
     "IngestRequest",
@@ -16,4 +21,7 @@ __all__ = [
     "QueryResponse",
     "SourceDocument",
     "HealthResponse",
+    "MsgspecJSONResponse",
+    "QueryResponseFast",
+    "SourceDocumentFast",
 ]
@@ -0,0 +1,36 @@
+"""
+msgspec structs for hot-path API responses.
+Mirror the Pydantic response schemas, which remain the documented
+OpenAPI models, but are much cheaper to construct and encode.
+"""
+
+from typing import Any, Optional
+
+import msgspec
+from fastapi.responses import Response
+
+
+class SourceDocumentFast(msgspec.Struct, frozen=True):
+    """Source document used to generate a response. Mirrors SourceDocument."""
+    content: str
+    source: str
+    title: Optional[str] = None
+    relevance_score: float = 0.0
+    metadata: dict[str, Any] = {}
+
+
+class QueryResponseFast(msgspec.Struct, frozen=True):
+    """Response for RAG queries. Mirrors QueryResponse."""
+    answer: str
+    sources: list[SourceDocumentFast] = []
+    query_time_ms: float = 0.0
+    confidence: Optional[float] = None
+
+
+class MsgspecJSONResponse(Response):
+    """JSON response encoded with msgspec, for structs and plain containers."""
+    
+    media_type = "application/json"
+    
+    def render(self, content: Any) -> bytes:
+        return msgspec.json.encode(content)
@@ -3,11 +3,13 @@ Pydantic schemas for API requests and responses.
 Provides type safety and automatic validation for all endpoints.
 """
 
-from datetime import datetime
+from datetime import UTC, datetime
 from enum import Enum
 from typing import Any, Optional
 
-from pydantic import BaseModel, Field
+from pydantic import BaseModel, ConfigDict, Field, model_validator
+
+from app.config import get_settings
 
 
 class IngestType(str, Enum):
@@ -36,8 +38,9 @@ class IngestRequest(BaseModel):
         description="Additional metadata to attach to ingested documents"
     )
     
-    model_config = {
-        "json_schema_extra": {
+    model_config = ConfigDict(
+        extra="forbid",
+        json_schema_extra={
             "examples": [
                 {
                     "type": "url",
@@ -51,8 +54,8 @@ class IngestRequest(BaseModel):
                     "metadata": {"category": "policy"}
                 }
             ]
-        }
-    }
+        },
+    )
 
 
 class IngestResponse(BaseModel):
@@ -72,6 +75,12 @@ class IngestResponse(BaseModel):
         default_factory=list,
         description="Any errors encountered during ingestion"
     )
+    job_id: Optional[str] = Field(
+        default=None,
+        description="ID of the background ingestion job"
+    )
+    
+    model_config = ConfigDict(extra="forbid")
 
 
 class SourceDocument(BaseModel):
@@ -90,6 +99,8 @@ class SourceDocument(BaseModel):
         default_factory=dict,
         description="Additional metadata about the source"
     )
+    
+    model_config = ConfigDict(extra="forbid")
 
 
 class QueryRequest(BaseModel):
@@ -103,15 +114,16 @@ class QueryRequest(BaseModel):
         default=None,
         ge=1,
         le=20,
-        description="Number of source documents to retrieve"
+        description="Number of source documents to retrieve (defaults to RETRIEVAL_TOP_K)"
     )
     include_sources: bool = Field(
         default=True,
         description="Whether to include source documents in response"
     )
     
-    model_config = {
-        "json_schema_extra": {
+    model_config = ConfigDict(
+        extra="forbid",
+        json_schema_extra={
             "examples": [
                 {
                     "question": "What is the company's remote work policy?",
@@ -119,8 +131,15 @@ class QueryRequest(BaseModel):
                     "include_sources": True
                 }
             ]
-        }
-    }
+        },
+    )
+    
+    @model_validator(mode="after")
+    def _fill_defaults(self) -> "QueryRequest":
+        """Resolve top_k once so downstream code always gets a concrete int."""
+        if self.top_k is None:
+            self.top_k = get_settings().retrieval_top_k
+        return self
 
 
 class QueryResponse(BaseModel):
@@ -138,6 +157,8 @@ class QueryResponse(BaseModel):
         default=None,
         description="Confidence score for the answer (0-1)"
     )
+    
+    model_config = ConfigDict(extra="forbid")
 
 
 class HealthResponse(BaseModel):
@@ -145,7 +166,7 @@ class HealthResponse(BaseModel):
     
     status: str = Field(description="Health status")
     timestamp: datetime = Field(
-        default_factory=datetime.utcnow,
+        default_factory=lambda: datetime.now(UTC),
         description="Timestamp of the health check"
     )
     version: str = Field(description="Application version")
@@ -153,6 +174,8 @@ class HealthResponse(BaseModel):
         default_factory=dict,
         description="Status of individual components"
     )
+    
+    model_config = ConfigDict(extra="forbid")
 
 
 class CollectionStats(BaseModel):
@@ -161,3 +184,5 @@ class CollectionStats(BaseModel):
     collection_name: str = Field(description="Name of the collection")
     document_count: int = Field(description="Number of documents/chunks stored")
     embedding_dimension: int = Field(description="Dimension of embeddings")
+    
+    model_config = ConfigDict(extra="forbid")
@@ -3,65 +3,139 @@ Ingestion API endpoints.
 Handles document ingestion from various sources.
 """
 
-from fastapi import APIRouter, HTTPException, BackgroundTasks
-from fastapi.responses import JSONResponse
+from uuid import uuid4
+
+from fastapi import APIRouter, Depends, HTTPException, BackgroundTasks
+from fastapi.responses import ORJSONResponse
 
 from app.models.schemas import IngestRequest, IngestResponse
 from app.services.ingestion import IngestionService
+from app.services.singletons import clear_query_cache, get_vector_store, reset_vector_store
 from app.services.vector_store import VectorStoreService
 from app.utils.logging import get_logger
 
-logger = get_logger(__name__)
+logger = get_logger(__name__).bind(component="ingest")
 
 router = APIRouter(prefix="/ingest", tags=["Ingestion"])
 
 
+# Status of background ingestion jobs, keyed by job ID
+_jobs: dict[str, IngestResponse] = {}
+_MAX_JOBS = 1000
+
+
+def _set_job(job_id: str, status: IngestResponse) -> None:
+    """Record a job status, dropping the oldest jobs past the cap."""
+    _jobs[job_id] = status
+    while len(_jobs) > _MAX_JOBS:
+        _jobs.pop(next(iter(_jobs)))
+
+
+async def _run_ingest(
+    job_id: str,
+    request: IngestRequest,
+    vector_store: VectorStoreService,
+) -> None:
+    """Run an ingestion job and record its result."""
+    _set_job(job_id, IngestResponse(success=False, message="running", job_id=job_id))
+    
+    service = IngestionService(vector_store=vector_store)
+    
+    try:
+        result = await service.ingest(
+            ingest_type=request.type,
+            source=request.source,
+            follow_links=request.follow_links,
+            metadata=request.metadata,
+        )
+        
+        # New documents can change the best answer to a cached question
+        if result.get("chunks_created"):
+            clear_query_cache()
+            
+        _set_job(job_id, IngestResponse(
+            success=result.get("success", False),
+            message=result.get("message", ""),
+            documents_processed=result.get("documents_processed", 0),
+            chunks_created=result.get("chunks_created", 0),
+            errors=result.get("errors", []),
+            job_id=job_id,
+        ))
+        
+    except Exception as e:
+        logger.error("ingest_error", job_id=job_id, error=str(e))
+        _set_job(job_id, IngestResponse(
+            success=False,
+            message=f"Ingestion failed: {str(e)}",
+            errors=[str(e)],
+            job_id=job_id,
+        ))
+        
+    finally:
+        await service.aclose()
+
+
 @router.post(
     "",
     response_model=IngestResponse,
+    status_code=202,
     summary="Ingest documents",
-    description="Ingest documents from URL, file, directory, or raw text into the vector store.",
+    description="Queue documents from URL, file, directory, or raw text for ingestion into the vector store.",
 )
-async def ingest_documents(request: IngestRequest) -> IngestResponse:
+async def ingest_documents(
+    request: IngestRequest,
+    background: BackgroundTasks,
+    vector_store: VectorStoreService = Depends(get_vector_store),
+) -> IngestResponse:
     """
-    Ingest documents into the vector store.
+    Queue documents for ingestion into the vector store.
     
     Supports multiple input types:
     - **url**: Scrape content from a URL (optionally follow links)
     - **file**: Load content from a local file
     - **directory**: Load all supported files from a directory
     - **text**: Ingest raw text content
+    
+    Returns immediately with a job ID; poll `/ingest/jobs/{job_id}`
+    for the result.
     """
+    job_id = uuid4().hex
+    
     logger.info(
         "ingest_request_received",
+        job_id=job_id,
         type=request.type,
         source=request.source[:100] if request.source else None,
         follow_links=request.follow_links,
     )
     
-    try:
-        service = IngestionService()
-        result = await service.ingest(
-            ingest_type=request.type,
-            source=request.source,
-            follow_links=request.follow_links,
-            metadata=request.metadata,
-        )
-        
-        return IngestResponse(
-            success=result.get("success", False),
-            message=result.get("message", ""),
-            documents_processed=result.get("documents_processed", 0),
-            chunks_created=result.get("chunks_created", 0),
-            errors=result.get("errors", []),
-        )
-        
-    except Exception as e:
-        logger.error("ingest_error", error=str(e))
+    _set_job(job_id, IngestResponse(success=False, message="queued", job_id=job_id))
+    background.add_task(_run_ingest, job_id, request, vector_store)
+    
+    return IngestResponse(
+        success=True,
+        message=f"queued:{job_id}",
+        job_id=job_id,
+    )
+
+
+@router.get(
+    "/jobs/{job_id}",
+    response_model=IngestResponse,
+    summary="Get ingestion job status",
+    description="Get the status or result of a queued ingestion job.",
+)
+async def get_job(job_id: str) -> IngestResponse:
+    """Get the status of a background ingestion job."""
+    status = _jobs.get(job_id)
+    
+    if status is None:
         raise HTTPException(
-            status_code=500,
-            detail=f"Ingestion failed: {str(e)}",
+            status_code=404,
+            detail=f"Unknown job: {job_id}",
         )
+        
+    return status
 
 
 @router.post(
@@ -70,7 +144,10 @@ async def ingest_documents(request: IngestRequest) -> IngestResponse:
     summary="Refresh vector store",
     description="Clear existing documents and re-ingest from source.",
 )
-async def refresh_documents(request: IngestRequest) -> IngestResponse:
+async def refresh_documents(
+    request: IngestRequest,
+    vector_store: VectorStoreService = Depends(get_vector_store),
+) -> IngestResponse:
     """
     Clear the vector store and re-ingest documents.
     
@@ -79,13 +156,13 @@ async def refresh_documents(request: IngestRequest) -> IngestResponse:
     """
     logger.info("refresh_request_received")
     
+    service = IngestionService(vector_store=vector_store)
+    
     try:
         # Clear existing documents
-        vector_store = VectorStoreService()
-        vector_store.delete_collection()
+        reset_vector_store(vector_store)
         
         # Re-ingest
-        service = IngestionService()
         result = await service.ingest(
             ingest_type=request.type,
             source=request.source,
@@ -93,6 +170,9 @@ async def refresh_documents(request: IngestRequest) -> IngestResponse:
             metadata=request.metadata,
         )
         
+        # Answers cached while re-ingesting saw a partial collection
+        clear_query_cache()
+        
         return IngestResponse(
             success=result.get("success", False),
             message=f"Collection refreshed. {result.get('message', '')}",
@@ -107,6 +187,9 @@ async def refresh_documents(request: IngestRequest) -> IngestResponse:
             status_code=500,
             detail=f"Refresh failed: {str(e)}",
         )
+        
+    finally:
+        await service.aclose()
 
 
 @router.delete(
@@ -114,7 +197,9 @@ async def refresh_documents(request: IngestRequest) -> IngestResponse:
     summary="Clear vector store",
     description="Delete all documents from the vector store.",
 )
-async def clear_documents() -> JSONResponse:
+async def clear_documents(
+    vector_store: VectorStoreService = Depends(get_vector_store),
+) -> ORJSONResponse:
     """
     Clear all documents from the vector store.
     
@@ -123,10 +208,9 @@ async def clear_documents() -> JSONResponse:
     logger.warning("clear_request_received")
     
     try:
-        vector_store = VectorStoreService()
-        vector_store.delete_collection()
+        reset_vector_store(vector_store)
         
-        return JSONResponse(
+        return ORJSONResponse(
             status_code=200,
             content={"message": "Vector store cleared successfully"},
         )
@@ -144,11 +228,12 @@ async def clear_documents() -> JSONResponse:
     summary="Get ingestion statistics",
     description="Get statistics about the ingested documents.",
 )
-async def get_stats() -> dict:
+async def get_stats(
+    vector_store: VectorStoreService = Depends(get_vector_store),
+) -> dict:
     """Get statistics about the vector store."""
     try:
-        vector_store = VectorStoreService()
-        return vector_store.get_stats()
+        return vector_store.get_stats(exact=True)
         
     except Exception as e:
         logger.error("stats_error", error=str(e))
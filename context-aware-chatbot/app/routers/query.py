@@ -3,14 +3,16 @@ Query API endpoints.
 Handles RAG queries and response generation.
 """
 
-from fastapi import APIRouter, HTTPException
+from fastapi import APIRouter, Depends, HTTPException
 from fastapi.responses import StreamingResponse
 
+from app.models.fast_schemas import MsgspecJSONResponse
 from app.models.schemas import QueryRequest, QueryResponse
 from app.services.rag_pipeline import RAGPipeline
+from app.services.singletons import get_rag_pipeline
 from app.utils.logging import get_logger
 
-logger = get_logger(__name__)
+logger = get_logger(__name__).bind(component="query")
 
 router = APIRouter(prefix="/query", tags=["Query"])
 
@@ -21,7 +23,10 @@ router = APIRouter(prefix="/query", tags=["Query"])
     summary="Query the RAG system",
     description="Ask a question and get an answer grounded in retrieved documents.",
 )
-async def query(request: QueryRequest) -> QueryResponse:
+async def query(
+    request: QueryRequest,
+    pipeline: RAGPipeline = Depends(get_rag_pipeline),
+) -> MsgspecJSONResponse:
     """
     Query the RAG system with a question.
     
@@ -30,6 +35,9 @@ async def query(request: QueryRequest) -> QueryResponse:
     2. Use the documents as context for the LLM
     3. Generate an answer grounded in the retrieved sources
     4. Return the answer with source citations
+    
+    QueryResponse documents the response shape; the body is encoded
+    directly from the pipeline's msgspec structs.
     """
     logger.info(
         "query_request_received",
@@ -39,7 +47,6 @@ async def query(request: QueryRequest) -> QueryResponse:
     )
     
     try:
-        pipeline = RAGPipeline()
         response = await pipeline.query(
             question=request.question,
             top_k=request.top_k,
@@ -53,7 +60,7 @@ async def query(request: QueryRequest) -> QueryResponse:
             query_time_ms=response.query_time_ms,
         )
         
-        return response
+        return MsgspecJSONResponse(response)
         
     except Exception as e:
         import traceback
@@ -75,7 +82,10 @@ async def query(request: QueryRequest) -> QueryResponse:
     summary="Stream query response",
     description="Ask a question and stream the answer as it's generated.",
 )
-async def stream_query(request: QueryRequest) -> StreamingResponse:
+async def stream_query(
+    request: QueryRequest,
+    pipeline: RAGPipeline = Depends(get_rag_pipeline),
+) -> StreamingResponse:
     """
     Stream a RAG query response.
     
@@ -89,8 +99,6 @@ async def stream_query(request: QueryRequest) -> StreamingResponse:
     )
     
     try:
-        pipeline = RAGPipeline()
-        
         async def generate():
             async for chunk in pipeline.stream_query(
                 question=request.question,
@@ -119,7 +127,8 @@ async def stream_query(request: QueryRequest) -> StreamingResponse:
 async def get_sources(
     question: str,
     top_k: int = 5,
-) -> list[dict]:
+    pipeline: RAGPipeline = Depends(get_rag_pipeline),
+) -> MsgspecJSONResponse:
     """
     Retrieve relevant source documents for a question.
     
@@ -135,10 +144,9 @@ async def get_sources(
     )
     
     try:
-        pipeline = RAGPipeline()
         sources = pipeline.get_retrieved_sources(question, top_k)
         
-        return [source.model_dump() for source in sources]
+        return MsgspecJSONResponse(sources)
         
     except Exception as e:
         logger.error("sources_error", error=str(e))
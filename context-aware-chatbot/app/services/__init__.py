@@ -3,9 +3,25 @@
 from app.services.vector_store import VectorStoreService
 from app.services.ingestion import IngestionService
 from app.services.rag_pipeline import RAGPipeline
+from app.services.embedding_cache import EmbeddingCache
+from app.services.singletons import (
+    clear_query_cache,
+    get_embedding_cache,
+    get_ollama_client,
+    get_rag_pipeline,
+    get_vector_store,
+    reset_vector_store,
+)
 
 __all__ = [
     "VectorStoreService",
     "IngestionService",
     "RAGPipeline",
+    "EmbeddingCache",
+    "clear_query_cache",
+    "get_embedding_cache",
+    "get_ollama_client",
+    "get_rag_pipeline",
+    "get_vector_store",
+    "reset_vector_store",
 ]
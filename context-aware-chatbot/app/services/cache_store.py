@@ -0,0 +1,151 @@
+"""
+Persistent response cache.
+Stores chat answers in SQLite with an expiry time, so a restart or reload
+of the chat UI keeps the answers it had already given.
+"""
+
+import sqlite3
+import time
+from pathlib import Path
+from threading import Lock
+from typing import Any, Generic, Optional, TypeVar
+
+import msgspec
+import numpy as np
+
+from app.utils.logging import get_logger
+
+logger = get_logger(__name__)
+
+T = TypeVar("T")
+
+
+class DiskCache(Generic[T]):
+    """
+    On-disk key-value cache with per-entry expiry.
+    
+    Features:
+    - Values stored as MessagePack and decoded back to a fixed type
+    - Optional embedding per entry, for rebuilding a semantic cache
+    - Expired entries pruned on open, oldest entries past max_size on write
+    - WAL mode, so several processes can share the file
+    """
+    
+    def __init__(self, path: str, value_type: Any, ttl: float = 600.0, max_size: int = 1024):
+        """
+        Open (or create) the cache database.
+        
+        Args:
+            path: Path to the SQLite file.
+            value_type: Type values are decoded to, e.g. a tuple of structs.
+            ttl: Seconds an entry stays valid.
+            max_size: Number of entries kept once the cache is pruned.
+        """
+        Path(path).parent.mkdir(parents=True, exist_ok=True)
+        
+        self.ttl = ttl
+        self.max_size = max_size
+        self._encoder = msgspec.msgpack.Encoder()
+        self._decoder = msgspec.msgpack.Decoder(value_type)
+        self._lock = Lock()
+        
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS entries ("
+            "key TEXT PRIMARY KEY, value BLOB NOT NULL, embedding BLOB, expires_at REAL NOT NULL)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS entries_expires_at ON entries (expires_at)")
+        
+        with self._lock:
+            self._prune()
+            self._conn.commit()
+            
+        logger.info("disk_cache_opened", path=path, entries=self._count)
+        
+    def get(self, key: str) -> Optional[T]:
+        """
+        Look up a live entry.
+        
+        Args:
+            key: Cache key.
+            
+        Returns:
+            The cached value, or None if absent or expired.
+        """
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT value FROM entries WHERE key = ? AND expires_at > ?",
+                (key, time.time()),
+            ).fetchone()
+            
+        return None if row is None else self._decoder.decode(row[0])
+        
+    def set(self, key: str, value: T, embedding: Optional[np.ndarray] = None) -> None:
+        """
+        Store a value, replacing any entry with the same key.
+        
+        Args:
+            key: Cache key.
+            value: Value to cache.
+            embedding: Embedding to store alongside the value.
+        """
+        blob = None if embedding is None else np.asarray(embedding, dtype=np.float32).tobytes()
+        
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO entries (key, value, embedding, expires_at) VALUES (?, ?, ?, ?)",
+                (key, self._encoder.encode(value), blob, time.time() + self.ttl),
+            )
+            
+            # Replacements overcount; pruning recounts. The slack keeps
+            # pruning from running on every write once the cache is full.
+            self._count += 1
+            if self._count > self.max_size + self.max_size // 10:
+                self._prune()
+                
+            self._conn.commit()
+            
+    def embedded_items(self) -> list[tuple[np.ndarray, float, T]]:
+        """
+        Get every live entry stored with an embedding.
+        
+        Returns:
+            (embedding, seconds left, value) tuples, soonest to expire first.
+        """
+        now = time.time()
+        
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT embedding, expires_at, value FROM entries "
+                "WHERE embedding IS NOT NULL AND expires_at > ? ORDER BY expires_at",
+                (now,),
+            ).fetchall()
+            
+        return [
+            (np.frombuffer(embedding, dtype=np.float32), expires_at - now, self._decoder.decode(value))
+            for embedding, expires_at, value in rows
+        ]
+        
+    def clear(self) -> None:
+        """Drop every entry."""
+        with self._lock:
+            self._conn.execute("DELETE FROM entries")
+            self._conn.commit()
+            self._count = 0
+            
+    def close(self) -> None:
+        """Close the database connection."""
+        with self._lock:
+            self._conn.close()
+            
+    def _prune(self) -> None:
+        """Drop expired entries, then the oldest past max_size. Caller holds the lock."""
+        self._conn.execute("DELETE FROM entries WHERE expires_at <= ?", (time.time(),))
+        self._conn.execute(
+            "DELETE FROM entries WHERE key IN "
+            "(SELECT key FROM entries ORDER BY expires_at DESC LIMIT -1 OFFSET ?)",
+            (self.max_size,),
+        )
+        self._count = self._conn.execute("SELECT COUNT(*) FROM entries").fetchone()[0]
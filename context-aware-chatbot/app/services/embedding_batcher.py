@@ -0,0 +1,116 @@
+"""
+Micro-batching of query embeddings.
+Concurrent requests each embed one short query; collecting them for a few
+milliseconds and encoding them together pays the model's per-call overhead
+once per batch instead of once per user.
+"""
+
+import asyncio
+import queue
+import time
+from threading import Thread
+from typing import Callable, Optional
+
+import numpy as np
+
+from app.utils.logging import get_logger
+
+logger = get_logger(__name__)
+
+
+def _resolve(future: asyncio.Future, result: Optional[np.ndarray], error: Optional[BaseException]) -> None:
+    """Complete a future on its own event loop, unless it was cancelled."""
+    if future.done():
+        return
+    if error is not None:
+        future.set_exception(error)
+    else:
+        future.set_result(result)
+
+
+class EmbeddingBatcher:
+    """
+    Background thread that coalesces single-text embedding requests.
+    
+    Features:
+    - Awaitable API, so the event loop never blocks on the model
+    - Waits at most max_wait after the first request before encoding
+    - One encode call per batch of up to max_batch texts
+    """
+    
+    def __init__(
+        self,
+        encode: Callable[[list[str]], np.ndarray],
+        max_batch: int = 32,
+        max_wait: float = 0.005,
+    ):
+        """
+        Initialize the batcher.
+        
+        Args:
+            encode: Embeds a list of texts, one row per text.
+            max_batch: Maximum texts per encode call.
+            max_wait: Seconds to wait for more requests after the first.
+        """
+        self.encode = encode
+        self.max_batch = max_batch
+        self.max_wait = max_wait
+        
+        self._queue: queue.Queue = queue.Queue()
+        self._thread: Optional[Thread] = None
+        
+    async def embed(self, text: str) -> np.ndarray:
+        """
+        Embed one text as part of the next batch.
+        
+        Args:
+            text: Text to embed.
+            
+        Returns:
+            The text's embedding vector.
+        """
+        if self._thread is None or not self._thread.is_alive():
+            self._thread = Thread(target=self._run, name="embedding-batcher", daemon=True)
+            self._thread.start()
+            
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self._queue.put((text, future, loop))
+        return await future
+        
+    def close(self) -> None:
+        """Stop the background thread once queued requests are served."""
+        if self._thread is not None and self._thread.is_alive():
+            self._queue.put(None)
+            self._thread.join()
+        self._thread = None
+        
+    def _run(self) -> None:
+        """Collect and encode batches until closed."""
+        while (first := self._queue.get()) is not None:
+            batch = [first]
+            deadline = time.monotonic() + self.max_wait
+            
+            while len(batch) < self.max_batch:
+                timeout = deadline - time.monotonic()
+                if timeout <= 0:
+                    break
+                try:
+                    item = self._queue.get(timeout=timeout)
+                except queue.Empty:
+                    break
+                if item is None:
+                    self._queue.put(None)  # Stop after this batch
+                    break
+                batch.append(item)
+                
+            try:
+                vectors = self.encode([text for text, _, _ in batch])
+                results = [(vector, None) for vector in vectors]
+            except Exception as e:
+                results = [(None, e)] * len(batch)
+                
+            logger.debug("embedding_batch_encoded", batch_size=len(batch))
+            
+            for (_, future, loop), (vector, error) in zip(batch, results):
+                loop.call_soon_threadsafe(_resolve, future, vector, error)
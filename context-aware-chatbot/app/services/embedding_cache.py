@@ -0,0 +1,106 @@
+"""
+Persistent embedding cache.
+Stores chunk embeddings in SQLite keyed by content hash, so re-ingesting
+unchanged content skips the embedding model.
+"""
+
+import sqlite3
+from pathlib import Path
+from threading import Lock
+
+import numpy as np
+
+from app.utils.logging import get_logger
+
+logger = get_logger(__name__)
+
+# SQLite caps the number of bound parameters per statement
+_MAX_PARAMS = 500
+
+
+class EmbeddingCache:
+    """
+    On-disk cache of embedding vectors.
+    
+    Features:
+    - Keyed on (encoder fingerprint, content hash)
+    - Vectors stored as float16 blobs to halve disk usage
+    - Safe to share across threads
+    """
+    
+    def __init__(self, path: str, model_name: str):
+        """
+        Open (or create) the cache database.
+        
+        Args:
+            path: Path to the SQLite file.
+            model_name: Embedding model, plus any encoder settings that change
+                its output, the cached vectors belong to.
+        """
+        Path(path).parent.mkdir(parents=True, exist_ok=True)
+        
+        self.model_name = model_name
+        self._lock = Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS embeddings ("
+            "model TEXT NOT NULL, hash TEXT NOT NULL, vec BLOB NOT NULL, "
+            "PRIMARY KEY (model, hash))"
+        )
+        self._conn.commit()
+        
+        logger.info("embedding_cache_opened", path=path, model=model_name)
+        
+    def get_many(self, hashes: list[str]) -> dict[str, np.ndarray]:
+        """
+        Look up cached vectors.
+        
+        Args:
+            hashes: Content hashes to look up.
+            
+        Returns:
+            Mapping of hash to float32 vector for every hash found.
+        """
+        found = {}
+        unique = list(dict.fromkeys(hashes))
+        
+        with self._lock:
+            for i in range(0, len(unique), _MAX_PARAMS):
+                batch = unique[i:i + _MAX_PARAMS]
+                placeholders = ",".join("?" * len(batch))
+                rows = self._conn.execute(
+                    f"SELECT hash, vec FROM embeddings WHERE model = ? AND hash IN ({placeholders})",
+                    [self.model_name, *batch],
+                )
+                for content_hash, blob in rows:
+                    found[content_hash] = np.frombuffer(blob, dtype=np.float16).astype(np.float32)
+                    
+        return found
+        
+    def put_many(self, hashes: list[str], vectors: np.ndarray) -> None:
+        """
+        Store vectors for the given content hashes.
+        
+        Args:
+            hashes: Content hashes, one per row of vectors.
+            vectors: Embedding matrix.
+        """
+        half = vectors.astype(np.float16)
+        rows = [
+            (self.model_name, content_hash, vector.tobytes())
+            for content_hash, vector in zip(hashes, half)
+        ]
+        
+        with self._lock:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO embeddings (model, hash, vec) VALUES (?, ?, ?)",
+                rows,
+            )
+            self._conn.commit()
+            
+    def close(self) -> None:
+        """Close the database connection."""
+        with self._lock:
+            self._conn.close()
@@ -0,0 +1,462 @@
+"""
+Vector store backed by a FAISS HNSW index over flat, 8-bit scalar- or
+product-quantized vectors.
+Drop-in alternative to the ChromaDB store, selected with VECTOR_BACKEND=faiss.
+"""
+
+import sqlite3
+from pathlib import Path
+from threading import Lock
+from typing import Optional
+
+import faiss
+import numpy as np
+import orjson
+
+from app.config import get_settings
+from app.services.vector_store import VectorStoreService, mmr_select
+from app.utils.logging import get_logger
+
+logger = get_logger(__name__)
+
+# HNSW graph degree and build/search breadth
+_HNSW_M = 32
+_EF_CONSTRUCTION = 200
+_EF_SEARCH = 64
+
+# Product quantization: at most this many sub-quantizers of 8 bits each,
+# trained once this many vectors are stored, with this many candidates
+# per result rescored against the float32 vectors
+_PQ_MAX_SUBQUANTIZERS = 64
+_PQ_TRAIN_SIZE = 20_000
+_PQ_REFINE_FACTOR = 4
+
+_INDEX_CLASSES = {
+    "hnsw_flat": faiss.IndexHNSWFlat,
+    "hnsw_sq8": faiss.IndexHNSWSQ,
+    "hnsw_pq": faiss.IndexHNSWPQ,
+}
+
+# SQLite caps the number of bound parameters per statement
+_MAX_PARAMS = 500
+
+
+class FaissVectorStore(VectorStoreService):
+    """
+    Vector store using FAISS HNSW over quantized vectors.
+    
+    Features:
+    - SQ8 (default): 4x smaller vectors than float32, with SIMD distance kernels
+    - PQ: ~64 bytes per vector in memory, candidates rescored in float32
+      from a memory-mapped file
+    - Inner product on unit-length vectors, equivalent to cosine
+    - Documents and metadata kept in SQLite next to the index
+    - Same add/search API (and search cache) as the ChromaDB store
+    """
+    
+    def __init__(self):
+        """
+        Initialize the FAISS vector store.
+        
+        Loads the embedding model and opens (or creates) the index and
+        document database under the Chroma persist directory.
+        """
+        settings = get_settings()
+        
+        logger.info(
+            "initializing_faiss_store",
+            embedding_model=settings.embedding_model,
+            persist_dir=settings.chroma_persist_dir,
+        )
+        
+        self._load_embedding_model(settings)
+        self._init_search_cache(settings)
+        self.collection_name = settings.chroma_collection_name
+        self.int8_index = None
+        
+        if settings.faiss_index_type not in _INDEX_CLASSES:
+            raise ValueError(f"FAISS_INDEX_TYPE must be one of {', '.join(_INDEX_CLASSES)}")
+        self.index_type = settings.faiss_index_type
+        
+        persist_dir = Path(settings.chroma_persist_dir)
+        persist_dir.mkdir(parents=True, exist_ok=True)
+        self._index_path = persist_dir / f"{self.collection_name}.faiss"
+        
+        # Full-precision copy of every vector, kept for PQ rescoring
+        self._raw_path = persist_dir / f"{self.collection_name}.raw.f32"
+        
+        self._lock = Lock()
+        self._db = sqlite3.connect(
+            persist_dir / f"{self.collection_name}.faiss.sqlite3",
+            check_same_thread=False,
+        )
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS documents ("
+            "row INTEGER PRIMARY KEY, doc_id TEXT UNIQUE NOT NULL, "
+            "document TEXT NOT NULL, metadata BLOB NOT NULL)"
+        )
+        self._db.commit()
+        
+        if self._index_path.is_file():
+            self.index = faiss.read_index(str(self._index_path))
+            if not isinstance(self.index, _INDEX_CLASSES[self.index_type]):
+                raise ValueError(
+                    f"{self._index_path} was not built as {self.index_type}; "
+                    "delete the collection before changing FAISS_INDEX_TYPE"
+                )
+        else:
+            self.index = self._new_index()
+            
+        # Stored rows; under PQ the index stays empty until it is trained
+        (self._count,) = self._db.execute("SELECT COUNT(*) FROM documents").fetchone()
+        
+        # The index file is written per ingest job, not per batch, so it
+        # can trail the committed documents after a crash
+        self._dirty = False
+        self._recover_index()
+        
+        logger.info(
+            "faiss_store_initialized",
+            collection_name=self.collection_name,
+            document_count=self.count(),
+            embedding_dimension=self.embedding_dimension,
+        )
+        
+    def _new_index(self) -> faiss.Index:
+        """Create an empty HNSW index of the configured type."""
+        dimension = self.embedding_dimension
+        
+        if self.index_type == "hnsw_flat":
+            index = faiss.IndexHNSWFlat(dimension, _HNSW_M, faiss.METRIC_INNER_PRODUCT)
+            
+        elif self.index_type == "hnsw_pq":
+            # L2 ranks unit vectors like inner product, and every candidate
+            # is rescored exactly anyway; training waits for enough vectors
+            subquantizers = next(
+                m for m in range(min(_PQ_MAX_SUBQUANTIZERS, dimension), 0, -1)
+                if dimension % m == 0
+            )
+            index = faiss.IndexHNSWPQ(dimension, subquantizers, _HNSW_M)
+            faiss.downcast_index(index.storage).pq.cp.niter = 25
+            
+        else:
+            index = faiss.IndexHNSWSQ(
+                dimension,
+                faiss.ScalarQuantizer.QT_8bit,
+                _HNSW_M,
+                faiss.METRIC_INNER_PRODUCT,
+            )
+            
+            # Unit-length vectors lie in [-1, 1] on every axis, so the
+            # quantizer ranges are fixed rather than learned from the first batch
+            bounds = np.stack([
+                np.full(dimension, -1.0, dtype=np.float32),
+                np.full(dimension, 1.0, dtype=np.float32),
+            ])
+            index.train(bounds)
+            
+        index.hnsw.efConstruction = _EF_CONSTRUCTION
+        return index
+        
+    def _raw_vectors(self) -> np.ndarray:
+        """Memory-map the float32 copy of every stored vector."""
+        if self._count == 0:
+            return np.empty((0, self.embedding_dimension), dtype=np.float32)
+        return np.memmap(
+            self._raw_path,
+            dtype=np.float32,
+            mode="r",
+            shape=(self._count, self.embedding_dimension),
+        )
+        
+    def _add_to_pq_index(self, vectors: np.ndarray) -> None:
+        """Append vectors to the raw file and the PQ index. Caller holds the lock."""
+        with open(self._raw_path, "ab") as raw_file:
+            raw_file.write(vectors.tobytes())
+        self._count += len(vectors)
+        
+        if self.index.is_trained:
+            self.index.add(vectors)
+        elif self._count >= _PQ_TRAIN_SIZE:
+            raw = np.ascontiguousarray(self._raw_vectors())
+            logger.info("training_pq_index", num_vectors=len(raw))
+            self.index.train(raw)
+            self.index.add(raw)
+            
+    def count(self, exact: bool = False) -> int:
+        """Get the number of stored documents, which is always tracked exactly."""
+        return self._count
+        
+    def add_precomputed(
+        self,
+        documents: list[str],
+        metadatas: list[dict],
+        ids: list[str],
+        embeddings: np.ndarray,
+    ) -> None:
+        """
+        Add documents whose embeddings are already known.
+        
+        IDs that are already stored are skipped, as ChromaDB's add does.
+        
+        Args:
+            documents: List of document texts.
+            metadatas: List of metadata dicts for each document.
+            ids: List of unique IDs for each document.
+            embeddings: Embedding matrix, one row per document.
+        """
+        if not documents:
+            return
+            
+        with self._lock:
+            existing = self._existing_ids(ids)
+            keep = [i for i, doc_id in enumerate(ids) if doc_id not in existing]
+            if not keep:
+                return
+                
+            vectors = np.ascontiguousarray(embeddings[keep], dtype=np.float32)
+            faiss.normalize_L2(vectors)
+            
+            start = self._count
+            self._db.executemany(
+                "INSERT INTO documents (row, doc_id, document, metadata) VALUES (?, ?, ?, ?)",
+                [
+                    (start + n, ids[i], documents[i], orjson.dumps(metadatas[i]))
+                    for n, i in enumerate(keep)
+                ],
+            )
+            if self.index_type == "hnsw_pq":
+                self._add_to_pq_index(vectors)
+            else:
+                self.index.add(vectors)
+                self._count += len(vectors)
+            self._db.commit()
+            self._dirty = True
+            
+        self.clear_search_cache()
+        
+        logger.info(
+            "documents_added",
+            total_documents=len(keep),
+            collection_count=self.count(),
+        )
+        
+    def persist(self) -> None:
+        """Write the index file, if documents were added since the last write."""
+        with self._lock:
+            if self._dirty:
+                faiss.write_index(self.index, str(self._index_path))
+                self._dirty = False
+                
+    def _recover_index(self) -> None:
+        """Add stored documents missing from the loaded index, e.g. after a crash."""
+        if self.index_type == "hnsw_pq":
+            # Drop raw vectors written for a batch whose documents never committed
+            raw_bytes = self._count * self.embedding_dimension * 4
+            if self._raw_path.is_file() and self._raw_path.stat().st_size > raw_bytes:
+                with open(self._raw_path, "r+b") as raw_file:
+                    raw_file.truncate(raw_bytes)
+                    
+            if not self.index.is_trained and self._count < _PQ_TRAIN_SIZE:
+                return
+                
+        missing = self._count - self.index.ntotal
+        if missing == 0:
+            return
+            
+        logger.warning("recovering_faiss_index", indexed=self.index.ntotal, stored=self._count)
+        
+        if missing < 0:
+            self.index = self._new_index()
+            
+        if self.index_type == "hnsw_pq":
+            raw = np.ascontiguousarray(self._raw_vectors())
+            if not self.index.is_trained and len(raw) >= _PQ_TRAIN_SIZE:
+                self.index.train(raw)
+            if self.index.is_trained:
+                self.index.add(raw[self.index.ntotal:])
+        else:
+            # Quantized vectors aren't kept elsewhere, so the missing rows are re-embedded
+            start = self.index.ntotal
+            rows = self._db.execute(
+                "SELECT document FROM documents WHERE row >= ? ORDER BY row",
+                (start,),
+            )
+            texts = [document for (document,) in rows]
+            for i in range(0, len(texts), self.embedding_batch_size):
+                vectors = np.ascontiguousarray(
+                    self.encode_documents(texts[i:i + self.embedding_batch_size]),
+                    dtype=np.float32,
+                )
+                faiss.normalize_L2(vectors)
+                self.index.add(vectors)
+                
+        faiss.write_index(self.index, str(self._index_path))
+        
+    def existing_ids(self, ids: list[str]) -> set[str]:
+        """
+        Find which of the given IDs are already stored.
+        
+        Args:
+            ids: Document IDs to check.
+            
+        Returns:
+            The subset of ids present in the store.
+        """
+        with self._lock:
+            return self._existing_ids(ids)
+            
+    def _existing_ids(self, ids: list[str]) -> set[str]:
+        """Look up stored IDs. Caller holds the lock."""
+        existing = set()
+        for i in range(0, len(ids), _MAX_PARAMS):
+            batch = ids[i:i + _MAX_PARAMS]
+            existing.update(
+                doc_id for (doc_id,) in self._db.execute(
+                    f"SELECT doc_id FROM documents WHERE doc_id IN ({','.join('?' * len(batch))})",
+                    batch,
+                )
+            )
+        return existing
+        
+    def _rows(self, rows: list[int]) -> dict[int, tuple[str, dict]]:
+        """Load documents and metadata for index rows."""
+        if not rows:
+            return {}
+            
+        with self._lock:
+            cursor = self._db.execute(
+                f"SELECT row, document, metadata FROM documents WHERE row IN ({','.join('?' * len(rows))})",
+                rows,
+            )
+            return {row: (document, orjson.loads(metadata)) for row, document, metadata in cursor}
+            
+    def _search(
+        self,
+        query_embedding: np.ndarray,
+        top_k: int,
+        where: Optional[dict],
+        include_scores: bool,
+        mmr_lambda: Optional[float],
+        fetch_k: int,
+    ) -> list[dict]:
+        """
+        Search the HNSW index, bypassing the cache.
+        
+        Only exact key/value matches are supported in where, applied to an
+        enlarged candidate set.
+        """
+        if self.count() == 0:
+            return []
+            
+        k = top_k
+        if mmr_lambda is not None:
+            k = max(fetch_k, top_k)
+        if where:
+            k *= 10
+            
+        query_vector = np.ascontiguousarray(query_embedding, dtype=np.float32).reshape(1, -1)
+        
+        if self.index_type == "hnsw_pq":
+            candidates = self._pq_candidates(query_vector, k)
+        else:
+            params = faiss.SearchParametersHNSW(efSearch=max(_EF_SEARCH, k))
+            
+            # HNSW doesn't support searching while another thread adds
+            with self._lock:
+                distances, rows = self.index.search(query_vector, k, params=params)
+                
+            candidates = [(int(row), float(score)) for row, score in zip(rows[0], distances[0]) if row >= 0]
+            
+        stored = self._rows([row for row, _ in candidates])
+        # Rows can be gone if the collection was deleted since the search
+        candidates = [(row, score) for row, score in candidates if row in stored]
+        
+        if where:
+            candidates = [
+                (row, score) for row, score in candidates
+                if all(stored[row][1].get(key) == value for key, value in where.items())
+            ]
+            
+        if mmr_lambda is not None and candidates:
+            rows = np.array([row for row, _ in candidates], dtype=np.int64)
+            with self._lock:
+                if self.index_type == "hnsw_pq":
+                    vectors = np.asarray(self._raw_vectors()[rows])
+                else:
+                    vectors = self.index.reconstruct_batch(rows)
+                    
+            selected, _ = mmr_select(query_embedding, vectors, top_k, mmr_lambda)
+            candidates = [candidates[i] for i in selected]
+            
+        formatted_results = [
+            {
+                "content": stored[row][0],
+                "metadata": stored[row][1],
+                "score": score if include_scores else None,
+            }
+            for row, score in candidates[:top_k]
+        ]
+        
+        logger.info(
+            "search_complete",
+            num_results=len(formatted_results),
+            top_score=formatted_results[0]["score"] if formatted_results else None,
+        )
+        
+        return formatted_results
+        
+    def _pq_candidates(self, query_vector: np.ndarray, k: int) -> list[tuple[int, float]]:
+        """
+        Find the k best rows under PQ, rescored with exact inner products.
+        
+        Until the quantizer is trained the stored set is small, so every
+        raw vector is scored directly.
+        """
+        with self._lock:
+            raw = self._raw_vectors()
+            if self.index.is_trained:
+                fetch = k * _PQ_REFINE_FACTOR
+                params = faiss.SearchParametersHNSW(efSearch=max(_EF_SEARCH, fetch))
+                _, rows = self.index.search(query_vector, fetch, params=params)
+                rows = rows[0][rows[0] >= 0]
+            else:
+                rows = np.arange(len(raw))
+                
+            # Read the memory-mapped rows in file order
+            rows = np.sort(rows)
+            vectors = np.asarray(raw[rows])
+            
+        scores = vectors @ query_vector[0]
+        k = min(k, len(scores))
+        if k == 0:
+            return []
+        top = np.argpartition(-scores, k - 1)[:k]
+        top = top[np.argsort(-scores[top])]
+        
+        return [(int(rows[i]), float(scores[i])) for i in top]
+        
+    def delete_collection(self) -> None:
+        """Delete all documents from the collection."""
+        logger.warning("deleting_collection", collection_name=self.collection_name)
+        
+        with self._lock:
+            self.index = self._new_index()
+            self._count = 0
+            self._dirty = False
+            self._index_path.unlink(missing_ok=True)
+            self._raw_path.unlink(missing_ok=True)
+            self._db.execute("DELETE FROM documents")
+            self._db.commit()
+            
+        self.clear_search_cache()
+        logger.info("collection_deleted")
+        
+    def get_stats(self, exact: bool = False) -> dict:
+        """Get statistics about the vector store."""
+        return {
+            "collection_name": self.collection_name,
+            "document_count": self.count(),
+            "embedding_dimension": self.embedding_dimension,
+        }
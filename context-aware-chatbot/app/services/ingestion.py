@@ -6,18 +6,48 @@ Handles loading, processing, and storing documents from various sources.
 import asyncio
 import hashlib
 import os
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
-from typing import Optional
+from typing import Iterator, Optional
+
+import numpy as np
 
 from app.config import get_settings
 from app.models.schemas import IngestType
+from app.services.embedding_cache import EmbeddingCache
+from app.services.singletons import get_embedding_cache, get_vector_store
 from app.services.vector_store import VectorStoreService
-from app.utils.chunking import SemanticChunker
+from app.utils.chunking import get_chunker
 from app.utils.logging import get_logger
 from app.utils.scraper import WebScraper
 
 logger = get_logger(__name__)
 
+_blake2b = hashlib.blake2b
+
+# Batches of chunks queued ahead of storage
+_PIPELINE_DEPTH = 4
+
+_SUPPORTED_EXTENSIONS = (".txt", ".md", ".html", ".htm")
+
+
+def _iter_files(root: Path) -> Iterator[Path]:
+    """
+    Walk a directory tree and yield supported files.
+    
+    Uses os.scandir so entries are filtered by name before any Path is
+    built, and directory entries come with their type without extra stats.
+    """
+    stack = [str(root)]
+    
+    while stack:
+        with os.scandir(stack.pop()) as entries:
+            for entry in entries:
+                if entry.is_dir(follow_symlinks=False):
+                    stack.append(entry.path)
+                elif entry.name.lower().endswith(_SUPPORTED_EXTENSIONS) and entry.is_file():
+                    yield Path(entry.path)
+
 
 class IngestionService:
     """
@@ -30,10 +60,23 @@ class IngestionService:
     - Raw text content
     """
     
-    def __init__(self):
-        """Initialize the ingestion service."""
-        self.vector_store = VectorStoreService()
-        self.chunker = SemanticChunker()
+    def __init__(
+        self,
+        vector_store: Optional[VectorStoreService] = None,
+        embedding_cache: Optional[EmbeddingCache] = None,
+    ):
+        """
+        Initialize the ingestion service.
+        
+        Args:
+            vector_store: Vector store to write to. Defaults to the shared
+                store for the configured backend.
+            embedding_cache: Cache of previously computed chunk embeddings.
+                Defaults to the shared cache, if enabled in settings.
+        """
+        self.vector_store = vector_store or get_vector_store()
+        self.embedding_cache = embedding_cache or get_embedding_cache()
+        self.chunker = get_chunker()
         self.scraper = WebScraper()
         
     async def ingest_url(
@@ -62,7 +105,7 @@ class IngestionService:
         metadata = metadata or {}
         
         # Scrape the URL(s)
-        self.scraper = WebScraper()  # Reset visited URLs
+        self.scraper.reset()  # Forget visited URLs, keep the HTTP session
         documents = await self.scraper.scrape_site(url, follow_links=follow_links)
         
         if not documents:
@@ -74,7 +117,7 @@ class IngestionService:
             }
             
         # Process and store documents
-        return self._process_documents(
+        return await self._process_documents(
             documents=[
                 {
                     "content": doc.content,
@@ -84,7 +127,7 @@ class IngestionService:
             ]
         )
         
-    def ingest_file(
+    async def ingest_file(
         self,
         file_path: str,
         metadata: Optional[dict] = None,
@@ -117,7 +160,7 @@ class IngestionService:
         metadata["type"] = "file"
         
         # Read file content
-        content = self._read_file(path)
+        content = await asyncio.to_thread(self._read_file, path)
         
         if not content:
             return {
@@ -127,11 +170,11 @@ class IngestionService:
                 "chunks_created": 0,
             }
             
-        return self._process_documents([
+        return await self._process_documents([
             {"content": content, "metadata": metadata}
         ])
         
-    def ingest_directory(
+    async def ingest_directory(
         self,
         directory_path: str,
         metadata: Optional[dict] = None,
@@ -159,26 +202,34 @@ class IngestionService:
             }
             
         metadata = metadata or {}
-        documents = []
-        supported_extensions = {".txt", ".md", ".html", ".htm"}
         
         # Find all supported files
-        for file_path in dir_path.rglob("*"):
-            if file_path.suffix.lower() in supported_extensions:
-                content = self._read_file(file_path)
+        paths = await asyncio.to_thread(lambda: list(_iter_files(dir_path)))
+        
+        # Read files concurrently so blocking opens overlap
+        contents = []
+        if paths:
+            loop = asyncio.get_running_loop()
+            with ThreadPoolExecutor(max_workers=min(32, len(paths))) as executor:
+                contents = await asyncio.gather(*[
+                    loop.run_in_executor(executor, self._read_file, file_path)
+                    for file_path in paths
+                ])
                 
-                if content:
-                    doc_metadata = {
-                        **metadata,
-                        "source": str(file_path.absolute()),
-                        "filename": file_path.name,
-                        "type": "file",
-                    }
-                    documents.append({
-                        "content": content,
-                        "metadata": doc_metadata,
-                    })
-                    
+        documents = [
+            {
+                "content": content,
+                "metadata": {
+                    **metadata,
+                    "source": str(file_path.absolute()),
+                    "filename": file_path.name,
+                    "type": "file",
+                },
+            }
+            for file_path, content in zip(paths, contents)
+            if content
+        ]
+        
         if not documents:
             return {
                 "success": False,
@@ -187,9 +238,9 @@ class IngestionService:
                 "chunks_created": 0,
             }
             
-        return self._process_documents(documents)
+        return await self._process_documents(documents)
         
-    def ingest_text(
+    async def ingest_text(
         self,
         text: str,
         metadata: Optional[dict] = None,
@@ -210,7 +261,7 @@ class IngestionService:
         metadata["type"] = "text"
         metadata["source"] = "direct_input"
         
-        return self._process_documents([
+        return await self._process_documents([
             {"content": text, "metadata": metadata}
         ])
         
@@ -219,28 +270,33 @@ class IngestionService:
         try:
             # Handle HTML files specially
             if path.suffix.lower() in {".html", ".htm"}:
-                from bs4 import BeautifulSoup
+                import lxml.html
                 
-                with open(path, "r", encoding="utf-8") as f:
-                    soup = BeautifulSoup(f.read(), "lxml")
-                    
-                # Remove script and style elements
-                for element in soup(["script", "style"]):
-                    element.decompose()
+                tree = lxml.html.fromstring(path.read_bytes())
+                
+                # Remove script, style and comment nodes, keeping any text after them
+                for element in tree.xpath("//script|//style|//comment()"):
+                    element.drop_tree()
                     
-                return soup.get_text(separator="\n", strip=True)
+                # Same output as BeautifulSoup's get_text(separator="\n", strip=True)
+                return "\n".join(
+                    text for text in (t.strip() for t in tree.itertext()) if text
+                )
             else:
-                with open(path, "r", encoding="utf-8") as f:
-                    return f.read()
-                    
+                return path.read_text(encoding="utf-8", errors="replace")
+                
         except Exception as e:
             logger.error("file_read_error", path=str(path), error=str(e))
             return None
             
-    def _process_documents(self, documents: list[dict]) -> dict:
+    async def _process_documents(self, documents: list[dict]) -> dict:
         """
         Process and store documents in the vector store.
         
+        Chunking, encoding and inserting are pipelined: each full batch of
+        chunks is encoded while the next documents are chunked and the
+        previous batch is written by a single writer thread.
+        
         Args:
             documents: List of documents with content and metadata.
             
@@ -249,51 +305,80 @@ class IngestionService:
         """
         logger.info("processing_documents", num_documents=len(documents))
         
-        # Chunk all documents
-        all_chunks = self.chunker.chunk_documents(documents)
+        batch_size = get_settings().embedding_batch_size
+        queue: asyncio.Queue = asyncio.Queue(maxsize=_PIPELINE_DEPTH)
+        total_chunks = 0
         
-        if not all_chunks:
-            return {
-                "success": False,
-                "message": "No chunks created from documents",
-                "documents_processed": len(documents),
-                "chunks_created": 0,
-            }
+        async def produce() -> None:
+            nonlocal total_chunks
+            texts: list[str] = []
+            metadatas: list[dict] = []
+            ids: list[str] = []
+            hashes: list[str] = []
             
-        # Generate unique IDs for each chunk
-        chunk_texts = []
-        chunk_metadatas = []
-        chunk_ids = []
-        
-        for chunk in all_chunks:
-            # Create deterministic ID from content hash
-            content_hash = hashlib.md5(chunk.content.encode()).hexdigest()[:12]
-            chunk_id = f"{chunk.metadata.get('source', 'unknown')}_{chunk.chunk_index}_{content_hash}"
+            for doc in documents:
+                metadata = doc.get("metadata", {})
+                doc_texts, doc_metadatas, doc_indices = await asyncio.to_thread(
+                    self.chunker.chunk_columns,
+                    doc.get("content", ""),
+                    metadata,
+                )
+                total_chunks += len(doc_texts)
+                
+                # Create deterministic IDs from content hashes; BLAKE2b is
+                # faster than MD5 and the hash is only an identifier
+                source = metadata.get("source", "unknown")
+                doc_hashes = [_blake2b(text.encode(), digest_size=16).hexdigest() for text in doc_texts]
+                
+                texts += doc_texts
+                metadatas += doc_metadatas
+                ids += [
+                    f"{source}_{index}_{content_hash[:12]}"
+                    for index, content_hash in zip(doc_indices, doc_hashes)
+                ]
+                hashes += doc_hashes
+                
+                while len(texts) >= batch_size:
+                    await queue.put((
+                        texts[:batch_size],
+                        metadatas[:batch_size],
+                        ids[:batch_size],
+                        hashes[:batch_size],
+                    ))
+                    del texts[:batch_size], metadatas[:batch_size], ids[:batch_size], hashes[:batch_size]
+                    
+            if texts:
+                await queue.put((texts, metadatas, ids, hashes))
+            await queue.put(None)
             
-            chunk_texts.append(chunk.content)
-            chunk_metadatas.append(chunk.metadata)
-            chunk_ids.append(chunk_id)
+        # One encoder and one writer, so batches never race on the store
+        loop = asyncio.get_running_loop()
+        encoder = ThreadPoolExecutor(max_workers=1, thread_name_prefix="ingest-encoder")
+        writer = ThreadPoolExecutor(max_workers=1, thread_name_prefix="ingest-writer")
+        
+        async def consume() -> None:
+            writing: Optional[asyncio.Future] = None
+            writing_ids: set[str] = set()
             
-        # Store in vector store
+            while (batch := await queue.get()) is not None:
+                # The batch being written isn't stored yet, so its IDs are
+                # excluded by hand
+                prepared = await loop.run_in_executor(encoder, self._embed_batch, *batch, writing_ids)
+                if writing is not None:
+                    await writing
+                    writing = None
+                    writing_ids = set()
+                if prepared is not None:
+                    writing = loop.run_in_executor(writer, self.vector_store.add_precomputed, *prepared)
+                    writing_ids = set(prepared[2])
+                    
+            if writing is not None:
+                await writing
+                
+        tasks = [asyncio.create_task(produce()), asyncio.create_task(consume())]
+        
         try:
-            self.vector_store.add_documents(
-                documents=chunk_texts,
-                metadatas=chunk_metadatas,
-                ids=chunk_ids,
-            )
-            
-            logger.info(
-                "ingestion_complete",
-                documents_processed=len(documents),
-                chunks_created=len(all_chunks),
-            )
-            
-            return {
-                "success": True,
-                "message": "Documents ingested successfully",
-                "documents_processed": len(documents),
-                "chunks_created": len(all_chunks),
-            }
+            await asyncio.gather(*tasks)
             
         except Exception as e:
             logger.error("ingestion_error", error=str(e))
@@ -305,6 +390,105 @@ class IngestionService:
                 "errors": [str(e)],
             }
             
+        finally:
+            for task in tasks:
+                task.cancel()
+            # Cancelling doesn't stop a batch already in a thread; let it
+            # finish so nothing writes after the job reports back
+            await asyncio.to_thread(encoder.shutdown)
+            await asyncio.to_thread(writer.shutdown)
+            # Index files are written once per job rather than per batch
+            await asyncio.to_thread(self.vector_store.persist)
+            
+        if not total_chunks:
+            return {
+                "success": False,
+                "message": "No chunks created from documents",
+                "documents_processed": len(documents),
+                "chunks_created": 0,
+            }
+            
+        logger.info(
+            "ingestion_complete",
+            documents_processed=len(documents),
+            chunks_created=total_chunks,
+        )
+        
+        return {
+            "success": True,
+            "message": "Documents ingested successfully",
+            "documents_processed": len(documents),
+            "chunks_created": total_chunks,
+        }
+        
+    def _embed_batch(
+        self,
+        texts: list[str],
+        metadatas: list[dict],
+        ids: list[str],
+        hashes: list[str],
+        pending_ids: set[str],
+    ) -> Optional[tuple[list[str], list[dict], list[str], np.ndarray]]:
+        """
+        Embed a batch of chunks for storage, each distinct text only once.
+        
+        Chunks whose ID is already stored are skipped, so re-ingesting
+        unchanged content does no work. Repeated chunks (shared headers,
+        footers) reuse one vector but keep their own IDs and metadata.
+        Vectors found in the embedding cache skip the model entirely.
+        
+        Args:
+            texts: Chunk texts.
+            metadatas: Metadata for each chunk.
+            ids: Vector store ID for each chunk.
+            hashes: Content hash for each chunk, used as the cache key.
+            pending_ids: IDs about to be stored, skipped like stored ones.
+            
+        Returns:
+            Texts, metadatas, IDs and embeddings to pass to add_precomputed,
+            or None if every chunk is already stored.
+        """
+        # IDs embed the source, position and content hash, so a stored ID
+        # means an identical chunk
+        stored = self.vector_store.existing_ids(ids) | pending_ids.intersection(ids)
+        if stored:
+            keep = [i for i, doc_id in enumerate(ids) if doc_id not in stored]
+            logger.debug("chunks_already_stored", skipped=len(ids) - len(keep))
+            if not keep:
+                return None
+            texts = [texts[i] for i in keep]
+            metadatas = [metadatas[i] for i in keep]
+            ids = [ids[i] for i in keep]
+            hashes = [hashes[i] for i in keep]
+            
+        # First position of each distinct content hash
+        first_index: dict[str, int] = {}
+        for i, content_hash in enumerate(hashes):
+            first_index.setdefault(content_hash, i)
+            
+        vectors = self.embedding_cache.get_many(hashes) if self.embedding_cache else {}
+        missing = [content_hash for content_hash in first_index if content_hash not in vectors]
+        
+        logger.debug(
+            "embedding_batch",
+            chunks=len(hashes),
+            unique=len(first_index),
+            cached=len(first_index) - len(missing),
+        )
+        
+        if missing:
+            embeddings = self.vector_store.encode_documents([texts[first_index[h]] for h in missing])
+            vectors.update(zip(missing, embeddings))
+            
+            if self.embedding_cache:
+                self.embedding_cache.put_many(missing, embeddings)
+                
+        return texts, metadatas, ids, np.stack([vectors[content_hash] for content_hash in hashes])
+        
+    async def aclose(self) -> None:
+        """Release network resources held by the scraper."""
+        await self.scraper.aclose()
+        
     async def ingest(
         self,
         ingest_type: IngestType,
@@ -327,11 +511,11 @@ class IngestionService:
         if ingest_type == IngestType.URL:
             return await self.ingest_url(source, follow_links, metadata)
         elif ingest_type == IngestType.FILE:
-            return self.ingest_file(source, metadata)
+            return await self.ingest_file(source, metadata)
         elif ingest_type == IngestType.DIRECTORY:
-            return self.ingest_directory(source, metadata)
+            return await self.ingest_directory(source, metadata)
         elif ingest_type == IngestType.TEXT:
-            return self.ingest_text(source, metadata)
+            return await self.ingest_text(source, metadata)
         else:
             return {
                 "success": False,
@@ -0,0 +1,166 @@
+"""
+Int8 quantized embedding index.
+Keeps a compact copy of every stored embedding for fast candidate scoring;
+exact float32 rescoring of the best candidates happens in the vector store.
+"""
+
+from pathlib import Path
+from threading import Lock
+
+import numpy as np
+import orjson
+
+from app.utils.logging import get_logger
+
+logger = get_logger(__name__)
+
+# Unit-length vectors have components in [-1, 1], so one fixed scale
+# maps them onto the int8 range
+INT8_SCALE = 127.0
+
+# Rows upcast to float32 at a time while scoring
+_SCORE_BLOCK = 4096
+
+
+def quantize(embeddings: np.ndarray) -> np.ndarray:
+    """
+    Scalar-quantize unit-length embeddings to int8.
+    
+    Args:
+        embeddings: Float embeddings, one per row (or a single vector).
+        
+    Returns:
+        Int8 array of the same shape.
+    """
+    return np.clip(np.rint(embeddings * INT8_SCALE), -127, 127).astype(np.int8)
+
+
+class Int8Index:
+    """
+    Brute-force int8 index over unit-length embeddings.
+    
+    Features:
+    - 4x smaller than float32 vectors, persisted as a .npy file
+    - Scores in fixed-size blocks so BLAS sees float32 but memory stays int8
+    - Upserts by document ID
+    - Appends into a buffer that grows geometrically; written to disk by
+      save(), not on every add
+    """
+    
+    def __init__(self, directory: str, dimension: int):
+        """
+        Load the index from disk, or start empty.
+        
+        Args:
+            directory: Directory holding the index files.
+            dimension: Embedding dimension.
+        """
+        self.dimension = dimension
+        self._dir = Path(directory)
+        self._vectors_path = self._dir / "int8_vectors.npy"
+        self._ids_path = self._dir / "int8_ids.json"
+        self._lock = Lock()
+        
+        # Rows [0, len(self._ids)) of the buffer are in use
+        self._buffer = np.empty((0, dimension), dtype=np.int8)
+        self._ids: list[str] = []
+        self._dirty = False
+        
+        if self._vectors_path.is_file() and self._ids_path.is_file():
+            vectors = np.load(self._vectors_path)
+            ids = orjson.loads(self._ids_path.read_bytes())
+            if vectors.shape == (len(ids), dimension):
+                self._buffer, self._ids = vectors, ids
+            else:
+                logger.warning("int8_index_mismatch", path=str(self._dir))
+                
+        self._rows = {doc_id: row for row, doc_id in enumerate(self._ids)}
+        
+    def __len__(self) -> int:
+        return len(self._ids)
+        
+    def add(self, ids: list[str], embeddings: np.ndarray) -> None:
+        """
+        Add or replace vectors. Call save() to persist them.
+        
+        Args:
+            ids: Document IDs, one per row of embeddings.
+            embeddings: Unit-length float embeddings.
+        """
+        quantized = quantize(embeddings)
+        
+        with self._lock:
+            for doc_id, vector in zip(ids, quantized):
+                row = self._rows.get(doc_id)
+                if row is None:
+                    row = len(self._ids)
+                    if row == len(self._buffer):
+                        self._grow()
+                    # Written before the ID is appended, so a search that
+                    # sees the ID also sees its vector
+                    self._buffer[row] = vector
+                    self._rows[doc_id] = row
+                    self._ids.append(doc_id)
+                else:
+                    self._buffer[row] = vector
+                    
+            self._dirty = True
+            
+    def search(self, query_embedding: np.ndarray, k: int) -> list[str]:
+        """
+        Find the approximate nearest documents.
+        
+        Args:
+            query_embedding: Unit-length query vector.
+            k: Number of candidates to return.
+            
+        Returns:
+            Document IDs, best first.
+        """
+        # IDs are only ever appended, so the first n stay valid after
+        # the lock is released
+        with self._lock:
+            n = len(self._ids)
+            vectors, ids = self._buffer[:n], self._ids
+            
+        if not n:
+            return []
+            
+        query = quantize(query_embedding).astype(np.float32)
+        scores = np.empty(n, dtype=np.float32)
+        
+        for start in range(0, n, _SCORE_BLOCK):
+            block = vectors[start:start + _SCORE_BLOCK]
+            scores[start:start + len(block)] = block.astype(np.float32) @ query
+            
+        k = min(k, n)
+        top = np.argpartition(-scores, k - 1)[:k]
+        top = top[np.argsort(-scores[top])]
+        
+        return [ids[i] for i in top]
+        
+    def save(self) -> None:
+        """Write the index files, if anything changed since the last save."""
+        with self._lock:
+            if not self._dirty:
+                return
+            self._dir.mkdir(parents=True, exist_ok=True)
+            np.save(self._vectors_path, self._buffer[:len(self._ids)])
+            self._ids_path.write_bytes(orjson.dumps(self._ids))
+            self._dirty = False
+            
+    def clear(self) -> None:
+        """Drop every vector and delete the index files."""
+        with self._lock:
+            self._buffer = np.empty((0, self.dimension), dtype=np.int8)
+            self._ids = []
+            self._rows = {}
+            self._dirty = False
+            self._vectors_path.unlink(missing_ok=True)
+            self._ids_path.unlink(missing_ok=True)
+            
+    def _grow(self) -> None:
+        """Double the buffer's capacity. Caller holds the lock."""
+        buffer = np.empty((max(2 * len(self._buffer), 1024), self.dimension), dtype=np.int8)
+        buffer[:len(self._ids)] = self._buffer[:len(self._ids)]
+        self._buffer = buffer
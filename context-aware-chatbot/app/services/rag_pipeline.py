@@ -3,21 +3,30 @@ RAG (Retrieval-Augmented Generation) pipeline.
 Combines retrieval from vector store with LLM generation.
 """
 
-import json
+import asyncio
+import hashlib
 import time
+from collections import OrderedDict
+from threading import Lock
 from typing import AsyncIterator, Optional
 
 import httpx
-from langchain_core.prompts import ChatPromptTemplate
+import msgspec
+import numpy as np
+import orjson
 from langchain_community.llms import Ollama
 
 from app.config import get_settings
-from app.models.schemas import QueryResponse, SourceDocument
+from app.models.fast_schemas import QueryResponseFast, SourceDocumentFast
+from app.services.semantic_cache import SemanticCache
 from app.services.vector_store import VectorStoreService
 from app.utils.logging import get_logger
 
 logger = get_logger(__name__)
 
+# Starts the text streamed in place of an answer when generation fails
+STREAM_ERROR_PREFIX = "\n\nError during generation: "
+
 # System prompt that enforces grounding in retrieved context (optimized for speed)
 RAG_SYSTEM_PROMPT = """Answer questions using ONLY the provided context. Be concise and factual.
 
@@ -34,6 +43,34 @@ RAG_USER_PROMPT = """Question: {question}
 
 Answer concisely based on the context above. Cite sources when relevant."""
 
+# Full prompt sent to Ollama, in the "role: content" layout of a formatted
+# chat template; only {context} and {question} are filled in per query
+RAG_PROMPT_TEMPLATE = f"system: {RAG_SYSTEM_PROMPT}\nhuman: {RAG_USER_PROMPT}"
+
+# Part of every prompt before the retrieved context. Ollama reuses the KV
+# cache of the longest prefix a prompt shares with the previous one, so
+# keeping instructions ahead of the context means they're computed once.
+RAG_PROMPT_PREFIX = RAG_PROMPT_TEMPLATE.split("{context}", 1)[0]
+
+
+# Generation options for direct Ollama calls
+# Optimized for speed: reduced response length and faster inference
+GENERATE_OPTIONS = {
+    "temperature": 0.1,
+    "num_predict": 300,  # Limit response length for faster generation
+    "num_ctx": 4096,  # Limit context window
+    "num_thread": 4,  # Use 4 threads for faster inference
+}
+
+_JSON_HEADERS = {"content-type": "application/json"}
+
+# Distinct (top_k, include_sources) combinations given their own answer cache
+_MAX_SEMANTIC_CACHE_NAMESPACES = 8
+
+# A model used within this long of its keep-alive running out is no longer
+# assumed to be loaded
+_KEEP_ALIVE_MARGIN = 60.0
+
 
 class RAGPipeline:
     """
@@ -44,23 +81,25 @@ class RAGPipeline:
     - Context-aware prompt construction
     - LLM generation with Ollama
     - Source citation in responses
+    - Semantic cache of answered queries
     - Streaming support
     """
     
-    _instance: Optional["RAGPipeline"] = None
-    
-    def __new__(cls) -> "RAGPipeline":
-        """Singleton pattern for resource efficiency."""
-        if cls._instance is None:
-            cls._instance = super().__new__(cls)
-            cls._instance._initialized = False
-        return cls._instance
-    
-    def __init__(self):
-        """Initialize the RAG pipeline."""
-        if self._initialized:
-            return
-            
+    def __init__(
+        self,
+        vector_store: Optional[VectorStoreService] = None,
+        http_client: Optional[httpx.AsyncClient] = None,
+    ):
+        """
+        Initialize the RAG pipeline.
+        
+        Args:
+            vector_store: Vector store to retrieve from. Defaults to the
+                shared store for the configured backend; prefer
+                app.services.singletons.get_rag_pipeline().
+            http_client: Client used to call Ollama, with its base URL set.
+                A new one is created if not provided.
+        """
         settings = get_settings()
         
         logger.info(
@@ -69,8 +108,21 @@ class RAGPipeline:
             ollama_url=settings.ollama_base_url,
         )
         
-        # Initialize vector store
-        self.vector_store = VectorStoreService()
+        # Initialize vector store; imported here because the singletons
+        # module builds pipelines
+        if vector_store is None:
+            from app.services.singletons import get_vector_store
+            
+            vector_store = get_vector_store()
+        self.vector_store = vector_store
+        
+        # Keep-alive client for direct Ollama API calls
+        self._owns_http_client = http_client is None
+        self.http_client = http_client or httpx.AsyncClient(
+            base_url=settings.ollama_base_url,
+            timeout=httpx.Timeout(settings.ollama_timeout, connect=30.0),
+            limits=httpx.Limits(max_keepalive_connections=20, max_connections=40),
+        )
         
         # Initialize LLM
         # Note: We'll use direct Ollama API calls instead of LangChain's Ollama wrapper
@@ -82,14 +134,27 @@ class RAGPipeline:
             temperature=0.1,  # Low temperature for more factual responses
         )
         
-        # Create prompt template
-        self.prompt = ChatPromptTemplate.from_messages([
-            ("system", RAG_SYSTEM_PROMPT),
-            ("human", RAG_USER_PROMPT),
-        ])
+        # Answers to past queries, keyed on question embedding, with one
+        # cache per (top_k, include_sources) so a lookup only ever matches
+        # answers that were produced with the same parameters
+        self._semantic_caches: OrderedDict[tuple[int, bool], SemanticCache[QueryResponseFast]] = OrderedDict()
+        self._semantic_caches_lock = Lock()
+        
+        # Ollama responses to past prompts, keyed on prompt hash. The model
+        # and options are hashed once and the digest copied per prompt.
+        self._gen_cache: OrderedDict[str, str] = OrderedDict()
+        self._gen_key_prefix = hashlib.sha256(settings.ollama_model.encode())
+        self._gen_key_prefix.update(orjson.dumps(GENERATE_OPTIONS, option=orjson.OPT_SORT_KEYS))
+        
+        # Time until which the model is assumed loaded in Ollama
+        self._llm_warm_until = 0.0
+        self._llm_warm_seconds = (
+            max(settings.ollama_keep_alive - _KEEP_ALIVE_MARGIN, 0.0)
+            if settings.ollama_keep_alive >= 0
+            else float("inf")
+        )
         
         self.settings = settings
-        self._initialized = True
         
         logger.info("rag_pipeline_initialized")
         
@@ -97,6 +162,8 @@ class RAGPipeline:
         self,
         query: str,
         top_k: Optional[int] = None,
+        include_scores: bool = True,
+        query_embedding: Optional[np.ndarray] = None,
     ) -> list[dict]:
         """
         Retrieve relevant documents for a query.
@@ -104,6 +171,9 @@ class RAGPipeline:
         Args:
             query: User's question.
             top_k: Number of documents to retrieve.
+            include_scores: Whether to fetch relevance scores, which are
+                only needed when sources are returned to the caller.
+            query_embedding: Precomputed embedding of the question.
             
         Returns:
             List of relevant documents with scores.
@@ -116,7 +186,14 @@ class RAGPipeline:
             top_k=top_k,
         )
         
-        results = self.vector_store.search(query, top_k=top_k)
+        results = self.vector_store.search(
+            query,
+            top_k=top_k,
+            include_scores=include_scores,
+            query_embedding=query_embedding,
+            mmr_lambda=self.settings.retrieval_mmr_lambda if self.settings.retrieval_mmr else None,
+            fetch_k=self.settings.retrieval_fetch_k,
+        )
         
         logger.info(
             "retrieval_complete",
@@ -148,35 +225,33 @@ class RAGPipeline:
             
         return "\n\n---\n\n".join(context_parts)
         
-    def _format_sources(self, documents: list[dict]) -> list[SourceDocument]:
+    def format_sources(self, documents: list[dict]) -> list[SourceDocumentFast]:
         """
-        Format documents into SourceDocument objects.
+        Format documents into source structs.
         
         Args:
             documents: Retrieved documents.
             
         Returns:
-            List of SourceDocument objects.
+            List of SourceDocumentFast objects.
         """
-        sources = []
-        
-        for doc in documents:
-            sources.append(SourceDocument(
+        return [
+            SourceDocumentFast(
                 content=doc["content"][:500] + ("..." if len(doc["content"]) > 500 else ""),
                 source=doc["metadata"].get("source", "Unknown"),
                 title=doc["metadata"].get("title"),
                 relevance_score=doc["score"],
                 metadata=doc["metadata"],
-            ))
-            
-        return sources
+            )
+            for doc in documents
+        ]
         
     async def query(
         self,
         question: str,
         top_k: Optional[int] = None,
         include_sources: bool = True,
-    ) -> QueryResponse:
+    ) -> QueryResponseFast:
         """
         Process a RAG query end-to-end.
         
@@ -186,18 +261,40 @@ class RAGPipeline:
             include_sources: Whether to include sources in response.
             
         Returns:
-            QueryResponse with answer and sources.
+            QueryResponseFast with answer and sources.
         """
         start_time = time.time()
         
         logger.info("processing_query", question=question[:100])
         
-        # Retrieve relevant documents
-        documents = self.retrieve(question, top_k)
+        top_k = top_k or self.settings.retrieval_top_k
+        
+        # Embed once; the same vector serves the cache lookup and retrieval
+        query_embedding = await self.vector_store.aembed(question)
+        
+        semantic_cache = self._semantic_cache_for(top_k, include_sources)
+        if semantic_cache is not None:
+            cached = semantic_cache.get(query_embedding)
+            if cached is not None:
+                logger.info("semantic_cache_hit", question=question[:100])
+                return msgspec.structs.replace(
+                    cached,
+                    query_time_ms=(time.time() - start_time) * 1000,
+                )
+                
+        # Retrieve relevant documents; metadata is still fetched because the
+        # prompt cites each source by title
+        documents = await asyncio.to_thread(
+            self.retrieve,
+            question,
+            top_k,
+            include_scores=include_sources,
+            query_embedding=query_embedding,
+        )
         
         if not documents:
             logger.warning("no_documents_retrieved", question=question[:100])
-            return QueryResponse(
+            return QueryResponseFast(
                 answer="I couldn't find any relevant information in my knowledge base to answer your question. Please try rephrasing or ask about a different topic.",
                 sources=[],
                 query_time_ms=(time.time() - start_time) * 1000,
@@ -210,58 +307,51 @@ class RAGPipeline:
         logger.info("generating_response", context_length=len(context))
         
         try:
-            # Check if Ollama is accessible before making the request
-            try:
-                httpx.get(f"{self.settings.ollama_base_url}/api/tags", timeout=5)
-            except Exception as e:
-                logger.error("ollama_not_accessible", error=str(e))
-                return QueryResponse(
-                    answer="Ollama is not running or not accessible. Please start Ollama first. On Windows, you can start it by running 'ollama serve' in a terminal.",
-                    sources=self._format_sources(documents) if include_sources else [],
-                    query_time_ms=(time.time() - start_time) * 1000,
-                )
-            
-            prompt_value = self.prompt.format_messages(
-                context=context,
-                question=question,
-            )
-            
-            # Convert messages to string for Ollama
-            prompt_str = "\n".join([
-                f"{msg.type}: {msg.content}" for msg in prompt_value
-            ])
+            prompt_str = RAG_PROMPT_TEMPLATE.format(context=context, question=question)
             
             logger.info("calling_ollama", prompt_length=len(prompt_str))
             
+            # Low temperature and fixed options make identical prompts
+            # safe to answer from memory
+            cache_key = self._generation_cache_key(prompt_str)
+            
             # Call Ollama directly with proper timeout handling
-            # Optimized for speed: reduced response length and faster inference
             try:
-                timeout_config = httpx.Timeout(self.settings.ollama_timeout, connect=30.0)
-                with httpx.Client(timeout=timeout_config) as client:
-                    ollama_response = client.post(
-                        f"{self.settings.ollama_base_url}/api/generate",
-                        json={
+                response = self._gen_cache.get(cache_key) if self.settings.exact_cache_enabled else None
+                if response is not None:
+                    self._gen_cache.move_to_end(cache_key)
+                    logger.info("generation_cache_hit")
+                else:
+                    ollama_response = await self.http_client.post(
+                        "/api/generate",
+                        content=orjson.dumps({
                             "model": self.settings.ollama_model,
                             "prompt": prompt_str,
                             "stream": False,
-                            "options": {
-                                "temperature": 0.1,
-                                "num_predict": 300,  # Limit response length for faster generation
-                                "num_ctx": 4096,  # Limit context window
-                                "num_thread": 4,  # Use 4 threads for faster inference
-                            }
-                        }
+                            "options": GENERATE_OPTIONS,
+                            "keep_alive": self.settings.ollama_keep_alive,
+                        }),
+                        headers=_JSON_HEADERS,
                     )
                     ollama_response.raise_for_status()
-                    result = ollama_response.json()
+                    result = orjson.loads(ollama_response.content)
                     response = result.get("response", "")
                     if not response:
                         raise ValueError("Empty response from Ollama")
+                    self._cache_generation(cache_key, response)
+            except (httpx.ConnectError, httpx.ConnectTimeout) as e:
+                # Ollama isn't listening; a fallback call would fail the same way
+                logger.error("ollama_not_accessible", error=str(e))
+                return QueryResponseFast(
+                    answer="Ollama is not running or not accessible. Please start Ollama first. On Windows, you can start it by running 'ollama serve' in a terminal.",
+                    sources=self.format_sources(documents) if include_sources else [],
+                    query_time_ms=(time.time() - start_time) * 1000,
+                )
             except httpx.TimeoutException as e:
                 logger.error("ollama_timeout", timeout=self.settings.ollama_timeout, error=str(e))
-                return QueryResponse(
+                return QueryResponseFast(
                     answer="The model is taking too long to respond. This often happens on the first request when the model needs to be loaded. Please wait a moment and try again.",
-                    sources=self._format_sources(documents) if include_sources else [],
+                    sources=self.format_sources(documents) if include_sources else [],
                     query_time_ms=(time.time() - start_time) * 1000,
                 )
             except Exception as e:
@@ -272,12 +362,12 @@ class RAGPipeline:
                 except Exception as fallback_error:
                     logger.error("langchain_fallback_failed", error=str(fallback_error), error_type=type(fallback_error).__name__)
                     # Return error response instead of raising
-                    return QueryResponse(
+                    return QueryResponseFast(
                         answer=f"Error generating response: {str(e)}. Fallback also failed: {str(fallback_error)}",
-                        sources=self._format_sources(documents) if include_sources else [],
+                        sources=self.format_sources(documents) if include_sources else [],
                         query_time_ms=(time.time() - start_time) * 1000,
                     )
-            
+                    
             logger.info(
                 "response_generated",
                 response_length=len(response),
@@ -286,24 +376,137 @@ class RAGPipeline:
             
         except Exception as e:
             logger.error("generation_error", error=str(e))
-            return QueryResponse(
+            return QueryResponseFast(
                 answer=f"I encountered an error while generating a response. Please try again. Error: {str(e)}",
-                sources=self._format_sources(documents) if include_sources else [],
+                sources=self.format_sources(documents) if include_sources else [],
                 query_time_ms=(time.time() - start_time) * 1000,
             )
             
         query_time = (time.time() - start_time) * 1000
         
-        return QueryResponse(
+        result = QueryResponseFast(
             answer=response,
-            sources=self._format_sources(documents) if include_sources else [],
+            sources=self.format_sources(documents) if include_sources else [],
             query_time_ms=query_time,
         )
         
+        if semantic_cache is not None:
+            semantic_cache.put(query_embedding, result)
+            
+        return result
+        
+    def _generation_cache_key(self, prompt: str) -> str:
+        """Hash a prompt together with the model and options that shape its answer."""
+        key = self._gen_key_prefix.copy()
+        key.update(prompt.encode())
+        return key.hexdigest()
+        
+    def _cache_generation(self, key: str, response: str) -> None:
+        """Store a generated response, evicting the oldest past the size cap."""
+        if not self.settings.exact_cache_enabled:
+            return
+            
+        self._gen_cache[key] = response
+        while len(self._gen_cache) > self.settings.exact_cache_size:
+            self._gen_cache.popitem(last=False)
+            
+    def _semantic_cache_for(
+        self,
+        top_k: int,
+        include_sources: bool,
+    ) -> Optional[SemanticCache[QueryResponseFast]]:
+        """Get (or create) the answer cache for one parameter combination, or None if disabled."""
+        if not self.settings.semantic_cache_enabled:
+            return None
+            
+        namespace = (top_k, include_sources)
+        with self._semantic_caches_lock:
+            cache = self._semantic_caches.get(namespace)
+            if cache is None:
+                cache = SemanticCache(
+                    dimension=self.vector_store.embedding_dimension,
+                    max_size=self.settings.semantic_cache_size,
+                    threshold=self.settings.semantic_cache_threshold,
+                    int8=self.settings.semantic_cache_int8,
+                )
+                self._semantic_caches[namespace] = cache
+                if len(self._semantic_caches) > _MAX_SEMANTIC_CACHE_NAMESPACES:
+                    self._semantic_caches.popitem(last=False)
+            else:
+                self._semantic_caches.move_to_end(namespace)
+            return cache
+            
+    def clear_cache(self) -> None:
+        """Drop cached answers, e.g. after the knowledge base changes."""
+        with self._semantic_caches_lock:
+            self._semantic_caches.clear()
+            
+    async def aclose(self) -> None:
+        """Close the Ollama client if this pipeline created it."""
+        if self._owns_http_client:
+            await self.http_client.aclose()
+            
+            
+    async def aretrieve(
+        self,
+        question: str,
+        top_k: Optional[int] = None,
+        query_embedding: Optional[np.ndarray] = None,
+    ) -> list[dict]:
+        """
+        Retrieve relevant documents without blocking the event loop.
+        
+        Args:
+            question: User's question.
+            top_k: Number of documents to retrieve.
+            query_embedding: Precomputed embedding of the question.
+            
+        Returns:
+            List of relevant documents with scores.
+        """
+        if query_embedding is None:
+            query_embedding = await self.vector_store.aembed(question)
+        return await asyncio.to_thread(
+            self.retrieve,
+            question,
+            top_k,
+            query_embedding=query_embedding,
+        )
+        
+    async def prewarm_llm(self) -> None:
+        """
+        Have Ollama load the model and prefill the fixed prompt prefix.
+        Meant to run alongside retrieval so neither is paid after it;
+        skipped while the model was used recently. Failures are left for
+        the generation call to report.
+        """
+        if time.monotonic() < self._llm_warm_until:
+            return
+            
+        try:
+            # Same load-time options as generation, or Ollama would reload
+            # the model for the real request
+            response = await self.http_client.post(
+                "/api/generate",
+                content=orjson.dumps({
+                    "model": self.settings.ollama_model,
+                    "prompt": RAG_PROMPT_PREFIX,
+                    "stream": False,
+                    "options": {**GENERATE_OPTIONS, "num_predict": 1},
+                    "keep_alive": self.settings.ollama_keep_alive,
+                }),
+                headers=_JSON_HEADERS,
+            )
+            response.raise_for_status()
+            self._llm_warm_until = time.monotonic() + self._llm_warm_seconds
+        except httpx.HTTPError as e:
+            logger.warning("ollama_prewarm_failed", error=str(e))
+            
     async def stream_query(
         self,
         question: str,
         top_k: Optional[int] = None,
+        documents: Optional[list[dict]] = None,
     ) -> AsyncIterator[str]:
         """
         Stream a RAG query response.
@@ -311,15 +514,17 @@ class RAGPipeline:
         Args:
             question: User's question.
             top_k: Number of documents to retrieve.
-            
+            documents: Documents already retrieved for this question, e.g.
+                to show as sources; skips retrieval when given.
+                
         Yields:
             Chunks of the response as they're generated.
         """
         logger.info("streaming_query", question=question[:100])
         
-        # Retrieve relevant documents
-        documents = self.retrieve(question, top_k)
-        
+        if documents is None:
+            documents = await self.aretrieve(question, top_k)
+            
         if not documents:
             yield "I couldn't find any relevant information in my knowledge base to answer your question."
             return
@@ -328,29 +533,43 @@ class RAGPipeline:
         context = self._format_context(documents)
         
         # Generate prompt
-        prompt_value = self.prompt.format_messages(
-            context=context,
-            question=question,
-        )
-        
-        prompt_str = "\n".join([
-            f"{msg.type}: {msg.content}" for msg in prompt_value
-        ])
+        prompt_str = RAG_PROMPT_TEMPLATE.format(context=context, question=question)
         
-        # Stream response
+        # Stream response straight from Ollama's newline-delimited JSON
         try:
-            for chunk in self.llm.stream(prompt_str):
-                yield chunk
-                
+            async with self.http_client.stream(
+                "POST",
+                "/api/generate",
+                content=orjson.dumps({
+                    "model": self.settings.ollama_model,
+                    "prompt": prompt_str,
+                    "stream": True,
+                    "options": GENERATE_OPTIONS,
+                    "keep_alive": self.settings.ollama_keep_alive,
+                }),
+                headers=_JSON_HEADERS,
+            ) as ollama_response:
+                ollama_response.raise_for_status()
+                async for line in ollama_response.aiter_lines():
+                    if not line:
+                        continue
+                    data = orjson.loads(line)
+                    if data.get("response"):
+                        yield data["response"]
+                    if data.get("done"):
+                        break
+                        
+            self._llm_warm_until = time.monotonic() + self._llm_warm_seconds
+            
         except Exception as e:
             logger.error("streaming_error", error=str(e))
-            yield f"\n\nError during generation: {str(e)}"
+            yield f"{STREAM_ERROR_PREFIX}{str(e)}"
             
     def get_retrieved_sources(
         self,
         question: str,
         top_k: Optional[int] = None,
-    ) -> list[SourceDocument]:
+    ) -> list[SourceDocumentFast]:
         """
         Get just the retrieved sources without generating a response.
         Useful for showing sources alongside streaming responses.
@@ -363,4 +582,4 @@ class RAGPipeline:
             List of source documents.
         """
         documents = self.retrieve(question, top_k)
-        return self._format_sources(documents)
+        return self.format_sources(documents)
@@ -0,0 +1,170 @@
+"""
+Semantic cache for query responses.
+Matches new questions against past ones by embedding similarity, so
+paraphrased repeats skip retrieval and generation entirely.
+"""
+
+import time
+from collections import OrderedDict
+from threading import Lock
+from typing import Generic, Optional, TypeVar
+
+import numpy as np
+
+from app.utils.logging import get_logger
+
+logger = get_logger(__name__)
+
+T = TypeVar("T")
+
+# Rows upcast to float32 at a time when scoring int8 keys
+_SCORE_BLOCK = 4096
+
+
+class SemanticCache(Generic[T]):
+    """
+    Fixed-size cache keyed on unit-length embeddings.
+    
+    Features:
+    - Preallocated matrix, one row per cached query
+    - Lookup is a single matrix-vector product over all rows
+    - LRU eviction, reusing the evicted row in place
+    - Optional int8 rows with a per-row scale, 4x smaller than float32
+    - Optional per-entry expiry; expired rows never match and are reused first
+    """
+    
+    def __init__(
+        self,
+        dimension: int,
+        max_size: int = 256,
+        threshold: float = 0.95,
+        int8: bool = False,
+        ttl: Optional[float] = None,
+    ):
+        """
+        Initialize the cache.
+        
+        Args:
+            dimension: Embedding dimension.
+            max_size: Maximum number of cached entries.
+            threshold: Minimum cosine similarity for a hit.
+            int8: Store cached embeddings as int8. Similarities are then
+                off by well under 1e-3, which only matters right at the threshold.
+            ttl: Default seconds an entry stays valid; None never expires.
+        """
+        self.threshold = threshold
+        self.max_size = max_size
+        self.ttl = ttl
+        
+        self._matrix = np.zeros((max_size, dimension), dtype=np.int8 if int8 else np.float32)
+        # Per-row dequantization scales, when rows are int8
+        self._scales = np.ones(max_size, dtype=np.float32) if int8 else None
+        self._occupied = np.zeros(max_size, dtype=bool)
+        # Monotonic expiry time per row
+        self._expires = np.full(max_size, np.inf)
+        self._values: list[Optional[T]] = [None] * max_size
+        
+        # Row indices in least- to most-recently used order
+        self._lru: OrderedDict[int, None] = OrderedDict()
+        self._free = list(range(max_size - 1, -1, -1))
+        self._lock = Lock()
+        
+    def __len__(self) -> int:
+        return len(self._lru)
+        
+    def get(self, embedding: np.ndarray) -> Optional[T]:
+        """
+        Find the cached value for the most similar past query.
+        
+        Args:
+            embedding: Unit-length query embedding.
+            
+        Returns:
+            The cached value, or None if nothing is similar enough.
+        """
+        with self._lock:
+            if not self._lru:
+                return None
+                
+            # Expired rows are masked before picking the best match, so they
+            # can't shadow a live entry that is slightly less similar
+            scores = self._scores(embedding)
+            scores[~self._occupied | (self._expires <= time.monotonic())] = -np.inf
+            row = int(np.argmax(scores))
+            
+            if scores[row] < self.threshold:
+                return None
+                
+            self._lru.move_to_end(row)
+            logger.debug("semantic_cache_hit", similarity=float(scores[row]))
+            return self._values[row]
+            
+    def put(self, embedding: np.ndarray, value: T, ttl: Optional[float] = None) -> None:
+        """
+        Cache a value, evicting an expired or else the least recently used
+        entry if full.
+        
+        An entry similar enough to be a hit for this embedding is replaced
+        rather than kept alongside it, so repeats don't fill the cache with
+        near-identical rows.
+        
+        Args:
+            embedding: Unit-length query embedding.
+            value: Value to return for similar queries.
+            ttl: Seconds the entry stays valid. Defaults to the cache's ttl.
+        """
+        ttl = self.ttl if ttl is None else ttl
+        now = time.monotonic()
+        
+        with self._lock:
+            row = None
+            if self._lru:
+                scores = self._scores(embedding)
+                scores[~self._occupied] = -np.inf
+                best = int(np.argmax(scores))
+                if scores[best] >= self.threshold:
+                    row = best
+                    del self._lru[row]
+                    
+            if row is None and self._free:
+                row = self._free.pop()
+            elif row is None:
+                expired = np.flatnonzero(self._occupied & (self._expires <= now))
+                if len(expired):
+                    row = int(expired[0])
+                    del self._lru[row]
+                else:
+                    row, _ = self._lru.popitem(last=False)
+                    
+            if self._scales is None:
+                self._matrix[row] = embedding
+            else:
+                # Scale so the largest component maps to 127
+                scale = float(np.max(np.abs(embedding))) / 127.0 or 1.0
+                self._matrix[row] = np.rint(embedding / scale)
+                self._scales[row] = scale
+            self._occupied[row] = True
+            self._expires[row] = np.inf if ttl is None else now + ttl
+            self._values[row] = value
+            self._lru[row] = None
+            
+    def clear(self) -> None:
+        """Drop every cached entry."""
+        with self._lock:
+            self._occupied[:] = False
+            self._expires[:] = np.inf
+            self._values = [None] * self.max_size
+            self._lru.clear()
+            self._free = list(range(self.max_size - 1, -1, -1))
+            
+    def _scores(self, embedding: np.ndarray) -> np.ndarray:
+        """Similarity of every row to the query. Caller holds the lock."""
+        if self._scales is None:
+            return self._matrix @ embedding
+            
+        # The query stays float32, so only the stored rows are approximate
+        scores = np.empty(self.max_size, dtype=np.float32)
+        for start in range(0, self.max_size, _SCORE_BLOCK):
+            block = self._matrix[start:start + _SCORE_BLOCK]
+            scores[start:start + len(block)] = block.astype(np.float32) @ embedding
+        return scores * self._scales
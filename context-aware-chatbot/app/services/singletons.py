@@ -0,0 +1,117 @@
+"""
+Process-wide service accessors.
+Heavy services (embedding model, ChromaDB client, LLM pipeline) are built
+once per process and shared by every request handler.
+"""
+
+from functools import lru_cache
+from typing import Optional
+
+import httpx
+
+from app.config import Settings, get_settings
+from app.services.embedding_cache import EmbeddingCache
+from app.services.rag_pipeline import RAGPipeline
+from app.services.vector_store import VectorStoreService
+
+
+@lru_cache(maxsize=1)
+def get_vector_store() -> VectorStoreService:
+    """
+    Get the shared vector store instance.
+    Loads the embedding model and opens the configured backend on first call.
+    """
+    if get_settings().vector_backend == "faiss":
+        # Imported lazily so faiss stays an optional dependency
+        from app.services.faiss_store import FaissVectorStore
+        
+        return FaissVectorStore()
+        
+    return VectorStoreService()
+
+
+@lru_cache(maxsize=1)
+def get_embedding_cache() -> Optional[EmbeddingCache]:
+    """
+    Get the shared on-disk embedding cache.
+    Returns None when the cache is disabled in settings.
+    """
+    settings = get_settings()
+    if not settings.embedding_cache_enabled:
+        return None
+    return EmbeddingCache(settings.embedding_cache_path, _encoder_fingerprint(settings))
+
+
+def _encoder_fingerprint(settings: Settings) -> str:
+    """
+    Identify the encoder configuration cached embeddings were computed with.
+    Changing any setting that alters the vectors then misses the cache.
+    """
+    torch_backend = settings.embedding_backend == "torch"
+    return (
+        f"{settings.embedding_model}"
+        f"|seq={settings.embedding_max_seq_length}"
+        f"|q8={settings.quantize_encoder and torch_backend}"
+        f"|backend={settings.embedding_backend}:{'' if torch_backend else settings.embedding_onnx_file}"
+        f"|fp16={settings.embedding_compile and torch_backend}"
+    )
+
+
+@lru_cache(maxsize=1)
+def get_ollama_client() -> httpx.AsyncClient:
+    """
+    Get the shared HTTP client for Ollama.
+    Keeps connections alive between health probes and generation calls.
+    """
+    settings = get_settings()
+    return httpx.AsyncClient(
+        base_url=settings.ollama_base_url,
+        timeout=httpx.Timeout(settings.ollama_timeout, connect=30.0),
+        http2=True,
+        limits=httpx.Limits(max_keepalive_connections=20, max_connections=40),
+    )
+
+
+@lru_cache(maxsize=1)
+def get_rag_pipeline() -> RAGPipeline:
+    """
+    Get the shared RAG pipeline instance.
+    Reuses the shared vector store and Ollama client rather than opening
+    second ones.
+    """
+    return RAGPipeline(
+        vector_store=get_vector_store(),
+        http_client=get_ollama_client(),
+    )
+
+
+def clear_query_cache() -> None:
+    """
+    Drop cached answers from the shared RAG pipeline.
+    Call after the knowledge base changes; a no-op if the pipeline
+    hasn't been built yet.
+    """
+    if get_rag_pipeline.cache_info().currsize:
+        get_rag_pipeline().clear_cache()
+
+
+def reset_vector_store(
+    vector_store: Optional[VectorStoreService] = None,
+) -> VectorStoreService:
+    """
+    Drop and recreate the document collection.
+    
+    The collection handle is rebound on the shared instance, so the cache
+    is kept: clearing it would reload the embedding model and leave the
+    shared RAG pipeline pointing at the old instance.
+    
+    Args:
+        vector_store: Store to reset. Defaults to the shared instance.
+        
+    Returns:
+        The reset vector store, ready for new documents.
+    """
+    vector_store = vector_store or get_vector_store()
+    vector_store.delete_collection()
+    clear_query_cache()
+    return vector_store
@@ -3,17 +3,90 @@ Vector store service using ChromaDB.
 Handles embedding generation, storage, and similarity search.
 """
 
+import asyncio
+from collections import OrderedDict
+from pathlib import Path
+from threading import Lock
 from typing import Optional
 
 import chromadb
+import numpy as np
+import orjson
+import torch
 from chromadb.config import Settings as ChromaSettings
 from sentence_transformers import SentenceTransformer
 
-from app.config import get_settings
+from app.config import Settings, get_settings
+from app.services.embedding_batcher import EmbeddingBatcher
+from app.services.int8_index import Int8Index
+from app.services.semantic_cache import SemanticCache
 from app.utils.logging import get_logger
 
 logger = get_logger(__name__)
 
+# Held-out sentences used to check a quantized encoder against the float
+# one, and to warm up a compiled encoder
+_QUANTIZATION_PROBES = [
+    "How do I reset my password?",
+    "The quarterly report shows revenue grew by twelve percent.",
+    "Install the package with pip and restart the server.",
+    "Photosynthesis converts light energy into chemical energy.",
+    "Contact support if the problem persists after an update.",
+    "The meeting was moved to Thursday afternoon.",
+    "Vectors are normalized to unit length before indexing.",
+    "What are the opening hours on public holidays?",
+]
+_MIN_QUANTIZED_SIMILARITY = 0.99
+
+# Embeddings are unit length, so inner product ranks like cosine without
+# HNSW renormalizing vectors; Chroma reports the distance as 1 - dot product
+_COLLECTION_METADATA = {"hnsw:space": "ip"}
+
+# Distinct filter/parameter combinations given their own search cache
+_MAX_SEARCH_CACHE_NAMESPACES = 8
+
+
+def mmr_select(
+    query_embedding: np.ndarray,
+    candidates: np.ndarray,
+    top_k: int,
+    lambda_mult: float = 0.7,
+) -> tuple[list[int], np.ndarray]:
+    """
+    Pick a relevant but diverse subset with maximal marginal relevance.
+    
+    Each step is one matrix-vector product: the running maximum similarity
+    to the already selected rows is updated with the newest pick only.
+    
+    Args:
+        query_embedding: Unit-length query vector.
+        candidates: Candidate embeddings, one row per document.
+        top_k: Number of candidates to select.
+        lambda_mult: Trade-off between relevance (1.0) and diversity (0.0).
+        
+    Returns:
+        Tuple of (selected row indices in pick order, cosine similarity of
+        every candidate to the query).
+    """
+    candidates = candidates / np.linalg.norm(candidates, axis=1, keepdims=True).clip(min=1e-12)
+    relevance = candidates @ query_embedding
+    top_k = min(top_k, len(candidates))
+    
+    if top_k == 0:
+        return [], relevance
+        
+    selected = [int(np.argmax(relevance))]
+    max_similarity = candidates @ candidates[selected[0]]
+    
+    while len(selected) < top_k:
+        scores = lambda_mult * relevance - (1 - lambda_mult) * max_similarity
+        scores[selected] = -np.inf
+        best = int(np.argmax(scores))
+        selected.append(best)
+        np.maximum(max_similarity, candidates @ candidates[best], out=max_similarity)
+        
+    return selected, relevance
+
 
 class VectorStoreService:
     """
@@ -23,22 +96,16 @@ class VectorStoreService:
     - Local embedding generation using sentence-transformers
     - Persistent storage with ChromaDB
     - Similarity search with metadata filtering
+    - Optional int8 candidate search with float32 rescoring
     """
     
-    _instance: Optional["VectorStoreService"] = None
-    
-    def __new__(cls) -> "VectorStoreService":
-        """Singleton pattern to reuse embedding model and DB connection."""
-        if cls._instance is None:
-            cls._instance = super().__new__(cls)
-            cls._instance._initialized = False
-        return cls._instance
-    
     def __init__(self):
-        """Initialize the vector store service."""
-        if self._initialized:
-            return
-            
+        """
+        Initialize the vector store service.
+        
+        Construction loads the embedding model and opens the database, so
+        use app.services.singletons.get_vector_store() to share one instance.
+        """
         settings = get_settings()
         
         logger.info(
@@ -47,9 +114,10 @@ class VectorStoreService:
             persist_dir=settings.chroma_persist_dir,
         )
         
-        # Initialize embedding model
-        self.embedding_model = SentenceTransformer(settings.embedding_model)
-        self.embedding_dimension = self.embedding_model.get_sentence_embedding_dimension()
+        self._load_embedding_model(settings)
+        self._init_search_cache(settings)
+        self._cached_count: Optional[int] = None
+        self._count_lock = Lock()
         
         # Initialize ChromaDB client with persistence
         self.chroma_client = chromadb.PersistentClient(
@@ -63,18 +131,195 @@ class VectorStoreService:
         # Get or create collection
         self.collection = self.chroma_client.get_or_create_collection(
             name=settings.chroma_collection_name,
-            metadata={"hnsw:space": "cosine"},
+            metadata=_COLLECTION_METADATA,
         )
-        
-        self._initialized = True
-        
+        if (self.collection.metadata or {}).get("hnsw:space") != "ip":
+            self._migrate_to_inner_product(settings.chroma_collection_name)
+            
+        # Int8 copy of the embeddings for candidate scoring
+        self.int8_index: Optional[Int8Index] = None
+        self.int8_candidates = settings.int8_candidates
+        if settings.int8_search:
+            self.int8_index = Int8Index(
+                str(Path(settings.chroma_persist_dir) / "int8_index"),
+                self.embedding_dimension,
+            )
+            if len(self.int8_index) != self.count():
+                self._rebuild_int8_index()
+                
         logger.info(
             "vector_store_initialized",
             collection_name=settings.chroma_collection_name,
-            document_count=self.collection.count(),
+            document_count=self.count(),
             embedding_dimension=self.embedding_dimension,
         )
         
+    def _load_embedding_model(self, settings: Settings) -> None:
+        """Load the sentence-transformers model used for every embedding."""
+        self.embedding_batch_size = settings.embedding_batch_size
+        
+        if settings.embedding_threads:
+            torch.set_num_threads(settings.embedding_threads)
+            
+        # Initialize embedding model
+        self.embedding_model = SentenceTransformer(
+            settings.embedding_model,
+            device=settings.embedding_device or None,
+            cache_folder=settings.onnx_cache_dir or None,
+            **self._backend_kwargs(settings),
+        )
+        if settings.embedding_max_seq_length:
+            # Attention cost grows with sequence length; long chunks are truncated
+            self.embedding_model.max_seq_length = settings.embedding_max_seq_length
+        if settings.quantize_encoder and settings.embedding_backend == "torch":
+            self._quantize_encoder()
+        if settings.embedding_compile and settings.embedding_backend == "torch":
+            self._compile_encoder()
+        self.embedding_dimension = self.embedding_model.get_sentence_embedding_dimension()
+        
+        # Coalesces query embeddings from concurrent requests
+        self.query_batcher: Optional[EmbeddingBatcher] = None
+        if settings.query_batch_wait_ms > 0:
+            self.query_batcher = EmbeddingBatcher(
+                self.encode_documents,
+                max_batch=settings.query_batch_size,
+                max_wait=settings.query_batch_wait_ms / 1000,
+            )
+            
+    def _quantize_encoder(self) -> None:
+        """
+        Swap the encoder's Linear layers for dynamic int8 versions.
+        
+        The quantized model is only kept if its embeddings of a few probe
+        sentences stay within 1% cosine distance of the float model's.
+        """
+        if self.embedding_model.device.type != "cpu":
+            logger.warning("encoder_quantization_skipped", device=str(self.embedding_model.device))
+            return
+            
+        quantized = torch.ao.quantization.quantize_dynamic(
+            self.embedding_model, {torch.nn.Linear}, dtype=torch.qint8
+        )
+        
+        reference = self.embedding_model.encode(_QUANTIZATION_PROBES, normalize_embeddings=True)
+        candidate = quantized.encode(_QUANTIZATION_PROBES, normalize_embeddings=True)
+        similarity = float(np.min(np.sum(reference * candidate, axis=1)))
+        
+        if similarity < _MIN_QUANTIZED_SIMILARITY:
+            logger.warning("encoder_quantization_rejected", min_similarity=similarity)
+            return
+            
+        self.embedding_model = quantized
+        logger.info("encoder_quantized", min_similarity=similarity)
+        
+    def _compile_encoder(self) -> None:
+        """
+        Run the encoder in half precision under torch.compile on CUDA.
+        
+        reduce-overhead mode captures CUDA graphs, removing the per-kernel
+        launch cost that dominates single-query embedding. The model is
+        warmed up at query and ingest batch sizes so the first requests
+        don't pay for compilation.
+        """
+        if self.embedding_model.device.type != "cuda":
+            logger.warning("encoder_compile_skipped", device=str(self.embedding_model.device))
+            return
+            
+        torch.backends.cuda.matmul.allow_tf32 = True
+        self.embedding_model.half()
+        
+        transformer = self.embedding_model[0]
+        transformer.auto_model = torch.compile(transformer.auto_model, mode="reduce-overhead")
+        
+        for batch_size in (1, self.embedding_batch_size):
+            self.embedding_model.encode(
+                _QUANTIZATION_PROBES[:1] * batch_size,
+                batch_size=batch_size,
+                show_progress_bar=False,
+            )
+            
+        logger.info("encoder_compiled", device=str(self.embedding_model.device))
+        
+    def _init_search_cache(self, settings: Settings) -> None:
+        """Set up the per-filter semantic caches of search results."""
+        self.search_cache_enabled = settings.search_cache_enabled
+        self.search_cache_size = settings.search_cache_size
+        self.search_cache_ttl = settings.search_cache_ttl
+        self.search_cache_threshold = settings.semantic_cache_threshold
+        self.search_cache_int8 = settings.semantic_cache_int8
+        self._search_caches: OrderedDict[bytes, SemanticCache[list[dict]]] = OrderedDict()
+        self._search_caches_lock = Lock()
+        
+    def _search_cache_for(self, namespace: bytes) -> SemanticCache[list[dict]]:
+        """Get (or create) the search cache for one filter/parameter combination."""
+        with self._search_caches_lock:
+            cache = self._search_caches.get(namespace)
+            if cache is None:
+                cache = SemanticCache(
+                    self.embedding_dimension,
+                    max_size=self.search_cache_size,
+                    threshold=self.search_cache_threshold,
+                    int8=self.search_cache_int8,
+                    ttl=self.search_cache_ttl,
+                )
+                self._search_caches[namespace] = cache
+                if len(self._search_caches) > _MAX_SEARCH_CACHE_NAMESPACES:
+                    self._search_caches.popitem(last=False)
+            else:
+                self._search_caches.move_to_end(namespace)
+            return cache
+            
+    def clear_search_cache(self) -> None:
+        """Drop cached search results. Called whenever the collection changes."""
+        with self._search_caches_lock:
+            self._search_caches.clear()
+            
+    @staticmethod
+    def _backend_kwargs(settings: Settings) -> dict:
+        """Build SentenceTransformer arguments for an ONNX or OpenVINO backend."""
+        if settings.embedding_backend == "torch":
+            return {}
+            
+        model_kwargs = {}
+        if settings.embedding_onnx_file:
+            model_kwargs["file_name"] = settings.embedding_onnx_file
+        if settings.embedding_backend == "onnx":
+            model_kwargs["provider"] = settings.embedding_onnx_provider
+            
+        return {"backend": settings.embedding_backend, "model_kwargs": model_kwargs}
+        
+    def count(self, exact: bool = False) -> int:
+        """
+        Get the number of stored documents.
+        
+        The count is kept in-process and updated on insert, so hot paths
+        don't issue a COUNT query per batch. It can drift when another
+        process writes to the same collection.
+        
+        Args:
+            exact: Query the collection instead of using the kept count.
+            
+        Returns:
+            The number of stored documents.
+        """
+        if exact or self._cached_count is None:
+            self._cached_count = self.collection.count()
+        return self._cached_count
+        
+    def existing_ids(self, ids: list[str]) -> set[str]:
+        """
+        Find which of the given IDs are already stored.
+        
+        Args:
+            ids: Document IDs to check.
+            
+        Returns:
+            The subset of ids present in the collection.
+        """
+        if not ids:
+            return set()
+        return set(self.collection.get(ids=ids, include=[])["ids"])
+        
     def generate_embeddings(self, texts: list[str]) -> list[list[float]]:
         """
         Generate embeddings for a list of texts.
@@ -85,15 +330,63 @@ class VectorStoreService:
         Returns:
             List of embedding vectors.
         """
+        return self.encode_documents(texts).tolist()
+        
+    def encode_documents(self, texts: list[str]) -> np.ndarray:
+        """
+        Embed a list of texts in batches.
+        
+        Args:
+            texts: List of text strings to embed.
+            
+        Returns:
+            Matrix of unit-length float32 embeddings, one row per text.
+        """
         logger.debug("generating_embeddings", num_texts=len(texts))
         
-        embeddings = self.embedding_model.encode(
+        # encode() sorts texts by length internally, so each batch is padded
+        # only to its own longest text
+        return self.embedding_model.encode(
             texts,
+            batch_size=self.embedding_batch_size,
             show_progress_bar=False,
             convert_to_numpy=True,
-        )
+            normalize_embeddings=True,
+        ).astype(np.float32, copy=False)
+        
+    def embed(self, text: str) -> np.ndarray:
+        """
+        Embed a single query text.
+        
+        Args:
+            text: Text to embed.
+            
+        Returns:
+            Unit-length float32 embedding vector.
+        """
+        return self.embedding_model.encode(
+            text,
+            show_progress_bar=False,
+            convert_to_numpy=True,
+            normalize_embeddings=True,
+        ).astype(np.float32, copy=False)
         
-        return embeddings.tolist()
+    async def aembed(self, text: str) -> np.ndarray:
+        """
+        Embed a single query text without blocking the event loop.
+        
+        Concurrent calls are encoded together by the query batcher when
+        it is enabled.
+        
+        Args:
+            text: Text to embed.
+            
+        Returns:
+            Unit-length float32 embedding vector.
+        """
+        if self.query_batcher is not None:
+            return await self.query_batcher.embed(text)
+        return await asyncio.to_thread(self.embed, text)
         
     def add_documents(
         self,
@@ -102,7 +395,7 @@ class VectorStoreService:
         ids: list[str],
     ) -> None:
         """
-        Add documents to the vector store.
+        Embed documents and add them to the vector store.
         
         Args:
             documents: List of document texts.
@@ -113,14 +406,35 @@ class VectorStoreService:
             logger.warning("no_documents_to_add")
             return
             
+        # Generate embeddings
+        embeddings = self.encode_documents(documents)
+        
+        self.add_precomputed(documents, metadatas, ids, embeddings)
+        
+    def add_precomputed(
+        self,
+        documents: list[str],
+        metadatas: list[dict],
+        ids: list[str],
+        embeddings: np.ndarray,
+    ) -> None:
+        """
+        Add documents whose embeddings are already known.
+        
+        Args:
+            documents: List of document texts.
+            metadatas: List of metadata dicts for each document.
+            ids: List of unique IDs for each document.
+            embeddings: Embedding matrix, one row per document.
+        """
+        if not documents:
+            return
+            
         logger.info(
             "adding_documents",
             num_documents=len(documents),
         )
         
-        # Generate embeddings
-        embeddings = self.generate_embeddings(documents)
-        
         # Add to ChromaDB in batches to handle large datasets
         batch_size = 100
         for i in range(0, len(documents), batch_size):
@@ -128,7 +442,7 @@ class VectorStoreService:
             
             self.collection.add(
                 documents=documents[i:batch_end],
-                embeddings=embeddings[i:batch_end],
+                embeddings=embeddings[i:batch_end].tolist(),
                 metadatas=metadatas[i:batch_end],
                 ids=ids[i:batch_end],
             )
@@ -139,17 +453,42 @@ class VectorStoreService:
                 batch_end=batch_end,
             )
             
+        if self.int8_index is not None:
+            self.int8_index.add(ids, embeddings)
+            
+        # Chroma skips IDs it already has, so this may overshoot until the
+        # next exact count
+        with self._count_lock:
+            if self._cached_count is not None:
+                self._cached_count += len(documents)
+        self.clear_search_cache()
+        
         logger.info(
             "documents_added",
             total_documents=len(documents),
-            collection_count=self.collection.count(),
+            collection_count=self.count(),
         )
         
+    def persist(self) -> None:
+        """
+        Write in-memory index state to disk.
+        
+        Adds only update memory, so an ingest writes index files once
+        rather than per batch. Called when an ingest job finishes and at
+        shutdown; an index left behind by a crash is rebuilt on load.
+        """
+        if self.int8_index is not None:
+            self.int8_index.save()
+            
     def search(
         self,
         query: str,
         top_k: int = 5,
         where: Optional[dict] = None,
+        include_scores: bool = True,
+        query_embedding: Optional[np.ndarray] = None,
+        mmr_lambda: Optional[float] = None,
+        fetch_k: int = 20,
     ) -> list[dict]:
         """
         Search for similar documents.
@@ -158,6 +497,13 @@ class VectorStoreService:
             query: Search query text.
             top_k: Number of results to return.
             where: Optional metadata filter.
+            include_scores: Whether to fetch distances. When False, each
+                result's score is None.
+            query_embedding: Precomputed embedding of the query, to avoid
+                encoding it again.
+            mmr_lambda: If set, rerank fetch_k nearest candidates with
+                maximal marginal relevance to drop near-duplicate chunks.
+            fetch_k: Number of candidates to consider for MMR.
             
         Returns:
             List of matching documents with scores.
@@ -169,35 +515,223 @@ class VectorStoreService:
         )
         
         # Generate query embedding
-        query_embedding = self.generate_embeddings([query])[0]
+        if query_embedding is None:
+            query_embedding = self.embed(query)
+            
+        if not self.search_cache_enabled:
+            return self._search(query_embedding, top_k, where, include_scores, mmr_lambda, fetch_k)
+            
+        # Results only carry over between searches with identical parameters
+        namespace = orjson.dumps(
+            [where, top_k, include_scores, mmr_lambda, fetch_k if mmr_lambda is not None else None],
+            option=orjson.OPT_SORT_KEYS,
+        )
+        cache = self._search_cache_for(namespace)
+        
+        cached = cache.get(query_embedding)
+        if cached is not None:
+            logger.info("search_cache_hit", num_results=len(cached))
+            return [dict(result) for result in cached]
+            
+        formatted_results = self._search(query_embedding, top_k, where, include_scores, mmr_lambda, fetch_k)
+        cache.put(query_embedding, formatted_results)
+        
+        return [dict(result) for result in formatted_results]
         
+    def _search(
+        self,
+        query_embedding: np.ndarray,
+        top_k: int,
+        where: Optional[dict],
+        include_scores: bool,
+        mmr_lambda: Optional[float],
+        fetch_k: int,
+    ) -> list[dict]:
+        """Run a search against the backing store, bypassing the cache."""
+        if self.int8_index is not None and where is None and mmr_lambda is None:
+            return self._search_int8(query_embedding, top_k, include_scores)
+            
+        if mmr_lambda is not None:
+            return self._search_mmr(query_embedding, top_k, where, mmr_lambda, max(fetch_k, top_k))
+            
         # Search ChromaDB
         results = self.collection.query(
-            query_embeddings=[query_embedding],
+            query_embeddings=[query_embedding.tolist()],
             n_results=top_k,
             where=where,
-            include=["documents", "metadatas", "distances"],
+            include=["documents", "metadatas", "distances"] if include_scores else ["documents", "metadatas"],
+        )
+        
+        # Build results straight from Chroma's columnar output
+        documents = results["documents"][0] if results["documents"] else []
+        metadatas = results["metadatas"][0] if results["metadatas"] else [{}] * len(documents)
+        
+        if include_scores:
+            distances = results["distances"][0] if results["distances"] else [0.0] * len(documents)
+            scores = [1 - distance for distance in distances]  # Inner-product distance (1 - dot) to similarity
+        else:
+            scores = [None] * len(documents)
+            
+        formatted_results = [
+            {"content": doc, "metadata": metadata or {}, "score": score}
+            for doc, metadata, score in zip(documents, metadatas, scores)
+        ]
+        
+        logger.info(
+            "search_complete",
+            num_results=len(formatted_results),
+            top_score=formatted_results[0]["score"] if formatted_results else None,
+        )
+        
+        return formatted_results
+        
+    def _search_int8(
+        self,
+        query_embedding: np.ndarray,
+        top_k: int,
+        include_scores: bool,
+    ) -> list[dict]:
+        """Pick candidates from the int8 index and rescore them in float32."""
+        candidate_ids = self.int8_index.search(query_embedding, max(self.int8_candidates, top_k))
+        if not candidate_ids:
+            return []
+            
+        results = self.collection.get(
+            ids=candidate_ids,
+            include=["documents", "metadatas", "embeddings"],
+        )
+        
+        # Exact cosine similarity on the stored float32 vectors
+        embeddings = np.asarray(results["embeddings"], dtype=np.float32)
+        embeddings /= np.linalg.norm(embeddings, axis=1, keepdims=True).clip(min=1e-12)
+        scores = embeddings @ query_embedding
+        
+        k = min(top_k, len(scores))
+        top = np.argpartition(-scores, k - 1)[:k]
+        top = top[np.argsort(-scores[top])]
+        
+        formatted_results = [
+            {
+                "content": results["documents"][i],
+                "metadata": results["metadatas"][i] or {},
+                "score": float(scores[i]) if include_scores else None,
+            }
+            for i in top
+        ]
+        
+        logger.info(
+            "search_complete",
+            num_results=len(formatted_results),
+            num_candidates=len(candidate_ids),
+            top_score=formatted_results[0]["score"] if formatted_results else None,
         )
         
-        # Format results
-        formatted_results = []
+        return formatted_results
+        
+    def _migrate_to_inner_product(self, name: str) -> None:
+        """
+        Copy a collection created with cosine space into an inner-product one.
+        
+        The space of an HNSW index can't be changed in place, so documents
+        are copied page by page into a new collection, with their vectors
+        normalized, which then takes over the original name.
+        """
+        logger.info("migrating_collection_to_ip", collection_name=name, document_count=self.count())
+        
+        staging_name = f"{name}_ip_migration"
+        try:
+            self.chroma_client.delete_collection(staging_name)
+        except Exception:
+            pass  # No leftover from an interrupted migration
+        staging = self.chroma_client.create_collection(name=staging_name, metadata=_COLLECTION_METADATA)
         
-        if results["documents"] and results["documents"][0]:
-            for i, doc in enumerate(results["documents"][0]):
-                # Convert distance to similarity score (cosine distance -> similarity)
-                distance = results["distances"][0][i] if results["distances"] else 0
-                similarity = 1 - distance  # Cosine distance to similarity
+        page_size = 5000
+        offset = 0
+        while True:
+            page = self.collection.get(
+                include=["documents", "metadatas", "embeddings"],
+                limit=page_size,
+                offset=offset,
+            )
+            if not page["ids"]:
+                break
                 
-                formatted_results.append({
-                    "content": doc,
-                    "metadata": results["metadatas"][0][i] if results["metadatas"] else {},
-                    "score": similarity,
-                })
+            embeddings = np.asarray(page["embeddings"], dtype=np.float32)
+            embeddings /= np.linalg.norm(embeddings, axis=1, keepdims=True).clip(min=1e-12)
+            staging.add(
+                ids=page["ids"],
+                documents=page["documents"],
+                metadatas=page["metadatas"],
+                embeddings=embeddings.tolist(),
+            )
+            offset += len(page["ids"])
+            
+        self.chroma_client.delete_collection(name)
+        staging.modify(name=name)
+        self.collection = self.chroma_client.get_collection(name)
+        self._cached_count = None
+        
+        logger.info("collection_migrated", collection_name=name, document_count=self.count())
+        
+    def _rebuild_int8_index(self) -> None:
+        """Rebuild the int8 index from the embeddings stored in ChromaDB."""
+        logger.info("rebuilding_int8_index", document_count=self.count())
+        
+        self.int8_index.clear()
+        
+        page_size = 5000
+        offset = 0
+        while True:
+            page = self.collection.get(include=["embeddings"], limit=page_size, offset=offset)
+            if not page["ids"]:
+                break
                 
+            embeddings = np.asarray(page["embeddings"], dtype=np.float32)
+            embeddings /= np.linalg.norm(embeddings, axis=1, keepdims=True).clip(min=1e-12)
+            self.int8_index.add(page["ids"], embeddings)
+            offset += len(page["ids"])
+            
+        self.int8_index.save()
+        
+    def _search_mmr(
+        self,
+        query_embedding: np.ndarray,
+        top_k: int,
+        where: Optional[dict],
+        lambda_mult: float,
+        fetch_k: int,
+    ) -> list[dict]:
+        """Fetch nearest candidates with their embeddings and rerank with MMR."""
+        results = self.collection.query(
+            query_embeddings=[query_embedding.tolist()],
+            n_results=fetch_k,
+            where=where,
+            include=["documents", "metadatas", "embeddings"],
+        )
+        
+        documents = results["documents"][0] if results["documents"] else []
+        if not documents:
+            return []
+            
+        metadatas = results["metadatas"][0] if results["metadatas"] else [{}] * len(documents)
+        candidates = np.asarray(results["embeddings"][0], dtype=np.float32)
+        
+        selected, relevance = mmr_select(query_embedding, candidates, top_k, lambda_mult)
+        
+        formatted_results = [
+            {
+                "content": documents[i],
+                "metadata": metadatas[i] or {},
+                "score": float(relevance[i]),
+            }
+            for i in selected
+        ]
+        
         logger.info(
             "search_complete",
             num_results=len(formatted_results),
-            top_score=formatted_results[0]["score"] if formatted_results else 0,
+            num_candidates=len(documents),
+            top_score=formatted_results[0]["score"] if formatted_results else None,
         )
         
         return formatted_results
@@ -210,15 +744,25 @@ class VectorStoreService:
         self.chroma_client.delete_collection(settings.chroma_collection_name)
         self.collection = self.chroma_client.get_or_create_collection(
             name=settings.chroma_collection_name,
-            metadata={"hnsw:space": "cosine"},
+            metadata=_COLLECTION_METADATA,
         )
         
+        if self.int8_index is not None:
+            self.int8_index.clear()
+            
+        self._cached_count = 0
+        self.clear_search_cache()
         logger.info("collection_deleted")
         
-    def get_stats(self) -> dict:
-        """Get statistics about the vector store."""
+    def get_stats(self, exact: bool = False) -> dict:
+        """
+        Get statistics about the vector store.
+        
+        Args:
+            exact: Count documents with a query rather than the kept count.
+        """
         return {
             "collection_name": self.collection.name,
-            "document_count": self.collection.count(),
+            "document_count": self.count(exact=exact),
             "embedding_dimension": self.embedding_dimension,
         }
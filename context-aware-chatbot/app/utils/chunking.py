@@ -3,8 +3,13 @@ Text chunking utilities for document processing.
 Implements semantic chunking for better retrieval quality.
 """
 
+import re
+from bisect import bisect_left, bisect_right
 from dataclasses import dataclass
-from typing import Optional
+from functools import lru_cache
+from itertools import accumulate
+from types import MappingProxyType
+from typing import Callable, Mapping, Optional
 
 from langchain_text_splitters import (
     RecursiveCharacterTextSplitter,
@@ -14,15 +19,124 @@ from langchain_text_splitters import (
 from app.config import get_settings
 from app.utils.logging import get_logger
 
+try:
+    # Optional Rust implementation of recursive splitting
+    from semantic_text_splitter import TextSplitter
+except ImportError:
+    TextSplitter = None
+
 logger = get_logger(__name__)
 
 
-@dataclass
+@dataclass(slots=True)
 class TextChunk:
-    """Represents a chunk of text with metadata."""
+    """
+    Represents a chunk of text with metadata.
+    
+    Chunks from the same document (or markdown section) share one
+    read-only base_metadata mapping; the per-chunk metadata dict is
+    built on access.
+    """
     content: str
-    metadata: dict
+    base_metadata: Mapping
     chunk_index: int
+    total_chunks: int
+    
+    @property
+    def metadata(self) -> dict:
+        return {
+            **self.base_metadata,
+            "chunk_index": self.chunk_index,
+            "total_chunks": self.total_chunks,
+        }
+
+
+# Sentence ends followed by whitespace, or blank lines between paragraphs
+_SENTENCE_BOUNDARY = re.compile(r"(?<=[.!?])\s+|\n\s*\n")
+
+# A heading as the first non-blank character
+_LEADING_HEADING = re.compile(r"\s*#")
+
+
+class SentenceSplitter:
+    """
+    Splitter that packs whole sentences into chunks.
+    
+    The length of each sentence is measured once; chunk ends and overlap
+    starts are then found by binary search over the running total.
+    Sentences longer than a chunk are handed to a fallback splitter.
+    """
+    
+    def __init__(
+        self,
+        chunk_size: int,
+        chunk_overlap: int,
+        fallback: Callable[[str], list[str]],
+        length_function: Callable[[str], int] = len,
+    ):
+        """
+        Initialize the splitter.
+        
+        Args:
+            chunk_size: Maximum chunk length, as measured by length_function.
+            chunk_overlap: Length of trailing sentences repeated in the next chunk.
+            fallback: Splits a sentence that doesn't fit in one chunk.
+            length_function: Measures the length of a piece of text.
+        """
+        self.chunk_size = chunk_size
+        self.chunk_overlap = chunk_overlap
+        self.fallback = fallback
+        self.length_function = length_function
+        
+    def split_text(self, text: str) -> list[str]:
+        """
+        Split text into chunks on sentence boundaries.
+        
+        Args:
+            text: Text to split.
+            
+        Returns:
+            List of chunk strings.
+        """
+        starts = [0, *(match.end() for match in _SENTENCE_BOUNDARY.finditer(text))]
+        ends = [*starts[1:], len(text)]
+        spans = [(start, end) for start, end in zip(starts, ends) if start < end]
+        
+        # prefix[j] - prefix[i] is the length of sentences i..j-1
+        prefix = [0, *accumulate(self.length_function(text[start:end]) for start, end in spans)]
+        
+        chunks = []
+        i = 0
+        last_end = 0
+        
+        while i < len(spans):
+            j = bisect_right(prefix, prefix[i] + self.chunk_size) - 1
+            
+            if j <= last_end and i < last_end:
+                # Overlap alone, with no room for a new sentence
+                i = last_end
+                continue
+                
+            if j <= i:
+                # A single sentence longer than a chunk
+                start, end = spans[i]
+                chunks.extend(self.fallback(text[start:end]))
+                i = last_end = i + 1
+                continue
+                
+            chunk = text[spans[i][0]:spans[j - 1][1]].strip()
+            if chunk:
+                chunks.append(chunk)
+                
+            if j >= len(spans):
+                break
+                
+            last_end = j
+            
+            # Start the next chunk at the earliest sentence within the overlap
+            i = max(bisect_left(prefix, prefix[j] - self.chunk_overlap), i + 1)
+            
+        return chunks
 
 
 class SemanticChunker:
@@ -31,7 +145,7 @@ class SemanticChunker:
     
     Uses a combination of strategies:
     - Markdown header splitting for structured documents
-    - Recursive character splitting with smart separators
+    - Sentence packing, with recursive character splitting for long sentences
     - Overlap for context preservation
     """
     
@@ -51,8 +165,35 @@ class SemanticChunker:
         self.chunk_size = chunk_size or settings.chunk_size
         self.chunk_overlap = chunk_overlap or settings.chunk_overlap
         
-        # Initialize text splitters
-        self.recursive_splitter = RecursiveCharacterTextSplitter(
+        # Initialize text splitters; the compiled splitter is preferred
+        # when semantic-text-splitter is installed
+        if TextSplitter is not None:
+            self.recursive_splitter = TextSplitter(self.chunk_size, overlap=self.chunk_overlap)
+            split_long_sentence = self.recursive_splitter.chunks
+        else:
+            self.recursive_splitter = self._langchain_splitter()
+            split_long_sentence = self.recursive_splitter.split_text
+            
+        # Packs whole sentences, falling back to the recursive splitter
+        self.sentence_splitter = SentenceSplitter(
+            chunk_size=self.chunk_size,
+            chunk_overlap=self.chunk_overlap,
+            fallback=split_long_sentence,
+        )
+        
+        # Markdown header splitter for structured documents
+        self.md_splitter = MarkdownHeaderTextSplitter(
+            headers_to_split_on=[
+                ("#", "header_1"),
+                ("##", "header_2"),
+                ("###", "header_3"),
+            ],
+            strip_headers=False,
+        )
+        
+    def _langchain_splitter(self) -> RecursiveCharacterTextSplitter:
+        """Build LangChain's pure-Python recursive character splitter."""
+        return RecursiveCharacterTextSplitter(
             chunk_size=self.chunk_size,
             chunk_overlap=self.chunk_overlap,
             separators=[
@@ -70,33 +211,26 @@ class SemanticChunker:
             length_function=len,
         )
         
-        # Markdown header splitter for structured documents
-        self.md_splitter = MarkdownHeaderTextSplitter(
-            headers_to_split_on=[
-                ("#", "header_1"),
-                ("##", "header_2"),
-                ("###", "header_3"),
-            ],
-            strip_headers=False,
-        )
-        
-    def chunk_text(
+    def _split(
         self,
         text: str,
-        metadata: Optional[dict] = None,
-    ) -> list[TextChunk]:
+        metadata: Mapping,
+    ) -> tuple[list[str], list[Mapping]]:
         """
-        Split text into semantic chunks.
+        Split text into chunk contents, each with its base metadata.
+        
+        Chunks cut from the same document or markdown section share a
+        single base metadata mapping rather than each getting a copy.
         
         Args:
             text: Text content to chunk.
             metadata: Base metadata to include with each chunk.
             
         Returns:
-            List of TextChunk objects.
+            Tuple of (contents, base metadata), one entry per chunk.
         """
-        metadata = metadata or {}
-        chunks = []
+        contents: list[str] = []
+        bases: list[Mapping] = []
         
         logger.debug(
             "chunking_text",
@@ -105,7 +239,8 @@ class SemanticChunker:
         )
         
         # Check if text appears to be markdown
-        is_markdown = text.strip().startswith("#") or "\n## " in text
+        # (matched in place rather than stripping a copy of the whole text)
+        is_markdown = _LEADING_HEADING.match(text) is not None or "\n## " in text
         
         if is_markdown:
             # Use markdown-aware splitting
@@ -114,53 +249,94 @@ class SemanticChunker:
             # Further split large chunks
             for md_chunk in md_chunks:
                 chunk_text = md_chunk.page_content
-                chunk_metadata = {**metadata, **md_chunk.metadata}
+                section_metadata = {**metadata, **md_chunk.metadata}
                 
                 if len(chunk_text) > self.chunk_size:
                     # Split large chunks further
-                    sub_chunks = self.recursive_splitter.split_text(chunk_text)
-                    for sub_chunk in sub_chunks:
-                        chunks.append(TextChunk(
-                            content=sub_chunk,
-                            metadata=chunk_metadata.copy(),
-                            chunk_index=len(chunks),
-                        ))
+                    sub_chunks = self.sentence_splitter.split_text(chunk_text)
+                    contents += sub_chunks
+                    bases += [section_metadata] * len(sub_chunks)
                 else:
-                    chunks.append(TextChunk(
-                        content=chunk_text,
-                        metadata=chunk_metadata,
-                        chunk_index=len(chunks),
-                    ))
+                    contents.append(chunk_text)
+                    bases.append(section_metadata)
         else:
-            # Use recursive splitting for plain text
-            split_texts = self.recursive_splitter.split_text(text)
-            
-            for i, chunk_text in enumerate(split_texts):
-                chunks.append(TextChunk(
-                    content=chunk_text,
-                    metadata=metadata.copy(),
-                    chunk_index=i,
-                ))
-                
-        # Add chunk-level metadata
-        total_chunks = len(chunks)
-        for chunk in chunks:
-            chunk.metadata["chunk_index"] = chunk.chunk_index
-            chunk.metadata["total_chunks"] = total_chunks
+            # Use sentence packing for plain text
+            contents = self.sentence_splitter.split_text(text)
+            bases = [metadata] * len(contents)
             
         logger.info(
             "chunking_complete",
             input_length=len(text),
-            num_chunks=total_chunks,
-            avg_chunk_size=len(text) // max(total_chunks, 1),
+            num_chunks=len(contents),
+            avg_chunk_size=len(text) // max(len(contents), 1),
         )
         
+        return contents, bases
+        
+    def chunk_columns(
+        self,
+        text: str,
+        metadata: Optional[dict] = None,
+    ) -> tuple[list[str], list[dict], list[int]]:
+        """
+        Split text into semantic chunks, returned as parallel columns.
+        
+        Args:
+            text: Text content to chunk.
+            metadata: Base metadata to include with each chunk.
+            
+        Returns:
+            Tuple of (contents, metadatas, chunk indices), one entry per chunk.
+        """
+        contents, bases = self._split(text, metadata or {})
+        
+        # Each chunk's metadata dict is built once, with its chunk-level keys
+        total_chunks = len(contents)
+        metadatas = [
+            {**base, "chunk_index": i, "total_chunks": total_chunks}
+            for i, base in enumerate(bases)
+        ]
+        
+        return contents, metadatas, list(range(total_chunks))
+        
+    def chunk_text(
+        self,
+        text: str,
+        metadata: Optional[dict] = None,
+    ) -> list[TextChunk]:
+        """
+        Split text into semantic chunks.
+        
+        Args:
+            text: Text content to chunk.
+            metadata: Base metadata to include with each chunk.
+            
+        Returns:
+            List of TextChunk objects.
+        """
+        contents, bases = self._split(text, dict(metadata or {}))
+        
+        # One read-only view per distinct base, shared by its chunks
+        views: dict[int, Mapping] = {}
+        chunks = []
+        
+        for i, (content, base) in enumerate(zip(contents, bases)):
+            view = views.get(id(base))
+            if view is None:
+                view = views[id(base)] = MappingProxyType(base)
+            chunks.append(TextChunk(
+                content=content,
+                base_metadata=view,
+                chunk_index=i,
+                total_chunks=len(contents),
+            ))
+            
         return chunks
         
     def chunk_documents(
         self,
         documents: list[dict],
-    ) -> list[TextChunk]:
+    ) -> tuple[list[str], list[dict], list[int]]:
         """
         Chunk multiple documents.
         
@@ -168,21 +344,45 @@ class SemanticChunker:
             documents: List of documents with 'content' and 'metadata' keys.
             
         Returns:
-            List of TextChunk objects from all documents.
+            Tuple of (contents, metadatas, chunk indices) across all documents.
         """
-        all_chunks = []
+        contents: list[str] = []
+        metadatas: list[dict] = []
+        indices: list[int] = []
         
         for doc in documents:
-            content = doc.get("content", "")
-            metadata = doc.get("metadata", {})
-            
-            doc_chunks = self.chunk_text(content, metadata)
-            all_chunks.extend(doc_chunks)
+            doc_contents, doc_metadatas, doc_indices = self.chunk_columns(
+                doc.get("content", ""),
+                doc.get("metadata", {}),
+            )
+            contents += doc_contents
+            metadatas += doc_metadatas
+            indices += doc_indices
             
         logger.info(
             "batch_chunking_complete",
             num_documents=len(documents),
-            total_chunks=len(all_chunks),
+            total_chunks=len(contents),
         )
         
-        return all_chunks
+        return contents, metadatas, indices
+
+
+@lru_cache(maxsize=4)
+def get_chunker(
+    chunk_size: Optional[int] = None,
+    chunk_overlap: Optional[int] = None,
+) -> SemanticChunker:
+    """
+    Get a shared chunker for the given sizes.
+    Building the splitters is repeated work, and a chunker holds no
+    per-document state, so one instance serves every ingest request.
+    
+    Args:
+        chunk_size: Maximum chunk size in characters; defaults to settings.
+        chunk_overlap: Overlap between consecutive chunks; defaults to settings.
+        
+    Returns:
+        The cached SemanticChunker.
+    """
+    return SemanticChunker(chunk_size=chunk_size, chunk_overlap=chunk_overlap)
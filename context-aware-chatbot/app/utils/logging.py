@@ -7,6 +7,7 @@ import logging
 import sys
 from typing import Any
 
+import orjson
 import structlog
 from structlog.typing import Processor
 
@@ -29,26 +30,36 @@ def setup_logging() -> None:
     )
     
     # Define processors for structlog
-    shared_processors: list[Processor] = [
+    processors: list[Processor] = [
+        # Drop events below the configured level before any other work
+        structlog.stdlib.filter_by_level,
         structlog.contextvars.merge_contextvars,
         structlog.processors.add_log_level,
-        structlog.processors.TimeStamper(fmt="iso"),
+        structlog.processors.TimeStamper(fmt=None, utc=True),
         structlog.stdlib.PositionalArgumentsFormatter(),
-        structlog.processors.StackInfoRenderer(),
+    ]
+    if log_level <= logging.DEBUG:
+        # Renders stack_info=True events; only needed when debugging
+        processors.append(structlog.processors.StackInfoRenderer())
+    processors += [
         structlog.processors.UnicodeDecoder(),
+        structlog.processors.JSONRenderer(serializer=_orjson_dumps),
     ]
     
     # Configure structlog
     structlog.configure(
-        processors=shared_processors + [
-            structlog.stdlib.ProcessorFormatter.wrap_for_formatter,
-        ],
+        processors=processors,
         logger_factory=structlog.stdlib.LoggerFactory(),
         wrapper_class=structlog.stdlib.BoundLogger,
         cache_logger_on_first_use=True,
     )
 
 
+def _orjson_dumps(event_dict: Any, default: Any = None, **_: Any) -> str:
+    """Serialize a log event with orjson, as the str stdlib logging expects."""
+    return orjson.dumps(event_dict, default=default, option=orjson.OPT_NON_STR_KEYS).decode()
+
+
 def get_logger(name: str) -> structlog.stdlib.BoundLogger:
     """
     Get a structured logger instance.
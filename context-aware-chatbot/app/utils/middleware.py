@@ -0,0 +1,65 @@
+"""
+ASGI middleware for the API server.
+"""
+
+from uuid import uuid4
+
+import structlog
+from starlette.middleware.gzip import GZipMiddleware
+from starlette.types import ASGIApp, Receive, Scope, Send
+
+
+class SelectiveGZipMiddleware:
+    """
+    GZip middleware that skips streaming endpoints.
+    
+    zlib buffers small writes until it has a full block, which would hold
+    back streamed tokens, so the listed paths are passed through as-is.
+    """
+    
+    def __init__(
+        self,
+        app: ASGIApp,
+        minimum_size: int = 500,
+        compresslevel: int = 9,
+        exclude_paths: tuple[str, ...] = (),
+    ):
+        """
+        Initialize the middleware.
+        
+        Args:
+            app: ASGI application to wrap.
+            minimum_size: Smallest response body to compress, in bytes.
+            compresslevel: GZip compression level (1-9).
+            exclude_paths: Request paths to leave uncompressed.
+        """
+        self.app = app
+        self.gzip = GZipMiddleware(app, minimum_size=minimum_size, compresslevel=compresslevel)
+        self.exclude_paths = frozenset(exclude_paths)
+        
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] == "http" and scope["path"] in self.exclude_paths:
+            await self.app(scope, receive, send)
+            return
+            
+        await self.gzip(scope, receive, send)
+
+
+class RequestIdMiddleware:
+    """
+    Bind a fresh request ID to the logging context for each request.
+    
+    Every log line emitted while handling the request carries the ID
+    without callers having to pass it explicitly.
+    """
+    
+    def __init__(self, app: ASGIApp):
+        self.app = app
+        
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+            
+        with structlog.contextvars.bound_contextvars(request_id=uuid4().hex):
+            await self.app(scope, receive, send)
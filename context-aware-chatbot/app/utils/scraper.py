@@ -4,17 +4,62 @@ Handles HTML parsing, link extraction, and content cleaning.
 """
 
 import asyncio
+import re
+from collections import deque
 from dataclasses import dataclass
-from typing import Optional
+from hashlib import blake2b
+from typing import Iterable, Optional
 from urllib.parse import urljoin, urlparse
 
 import aiohttp
-from bs4 import BeautifulSoup
+from selectolax.parser import HTMLParser
 
 from app.utils.logging import get_logger
 
 logger = get_logger(__name__)
 
+# Whitespace around line breaks, including whole blank lines
+_LINE_BREAK_PADDING = re.compile(r"\s*\n\s*")
+
+# Seconds allowed for one page, from connect to last byte
+_REQUEST_TIMEOUT = 30
+
+# Page chrome removed before extracting text
+_NON_CONTENT_TAGS = ["script", "style", "nav", "footer", "header"]
+
+
+class UrlSet:
+    """
+    Set of URLs stored as 64-bit digests.
+    
+    An int digest takes a fraction of the memory of the URL string and
+    hashes faster on lookup. Unlike a Bloom filter, a page is only
+    mistaken for visited on a 64-bit collision.
+    """
+    
+    __slots__ = ("_digests",)
+    
+    def __init__(self, urls: Iterable[str] = ()):
+        self._digests: set[int] = set()
+        for url in urls:
+            self.add(url)
+            
+    @staticmethod
+    def _digest(url: str) -> int:
+        return int.from_bytes(blake2b(url.encode(), digest_size=8).digest(), "little")
+        
+    def __contains__(self, url: str) -> bool:
+        return self._digest(url) in self._digests
+        
+    def __len__(self) -> int:
+        return len(self._digests)
+        
+    def add(self, url: str) -> None:
+        self._digests.add(self._digest(url))
+        
+    def clear(self) -> None:
+        self._digests.clear()
+
 
 @dataclass
 class ScrapedDocument:
@@ -33,7 +78,8 @@ class WebScraper:
     - Async HTTP requests for efficient scraping
     - HTML cleaning and text extraction
     - Metadata extraction (title, URL, etc.)
-    - Rate limiting to avoid overloading servers
+    - Concurrent crawling with per-host rate limiting
+    - One keep-alive HTTP session reused across crawls
     """
     
     def __init__(
@@ -41,6 +87,7 @@ class WebScraper:
         base_url: Optional[str] = None,
         max_pages: int = 100,
         request_delay: float = 0.5,
+        concurrency: int = 10,
     ):
         """
         Initialize the web scraper.
@@ -48,12 +95,58 @@ class WebScraper:
         Args:
             base_url: Base URL to restrict scraping scope.
             max_pages: Maximum number of pages to scrape.
-            request_delay: Delay between requests in seconds.
+            request_delay: Minimum delay between requests to one host, in seconds.
+            concurrency: Maximum number of pages fetched at once.
         """
         self.base_url = base_url
         self.max_pages = max_pages
         self.request_delay = request_delay
-        self.visited_urls: set[str] = set()
+        self.concurrency = concurrency
+        self.visited_urls = UrlSet()
+        
+        self._initial_base_url = base_url
+        self._session: Optional[aiohttp.ClientSession] = None
+        
+        # Earliest loop time at which each host may be requested again
+        self._next_request: dict[str, float] = {}
+        
+    def reset(self) -> None:
+        """Forget visited URLs and the crawl scope, keeping the HTTP session."""
+        self.visited_urls.clear()
+        self.base_url = self._initial_base_url
+        
+    def _get_session(self) -> aiohttp.ClientSession:
+        """Get the HTTP session, creating it on first use."""
+        if self._session is None or self._session.closed:
+            self._session = aiohttp.ClientSession(
+                connector=aiohttp.TCPConnector(
+                    limit=50,
+                    limit_per_host=self.concurrency,
+                    ttl_dns_cache=600,
+                    keepalive_timeout=60,
+                    enable_cleanup_closed=True,
+                ),
+                timeout=aiohttp.ClientTimeout(total=_REQUEST_TIMEOUT),
+            )
+        return self._session
+        
+    async def _wait_for_host(self, url: str) -> None:
+        """Sleep until the URL's host is due another request."""
+        now = asyncio.get_running_loop().time()
+        host = urlparse(url).netloc
+        
+        # Reserve the next slot before sleeping so concurrent workers queue up
+        slot = max(now, self._next_request.get(host, 0.0))
+        self._next_request[host] = slot + self.request_delay
+        
+        if slot > now:
+            await asyncio.sleep(slot - now)
+            
+    async def aclose(self) -> None:
+        """Close the HTTP session."""
+        if self._session is not None and not self._session.closed:
+            await self._session.close()
+        self._session = None
         
     async def scrape_url(
         self,
@@ -70,47 +163,69 @@ class WebScraper:
         Returns:
             ScrapedDocument if successful, None otherwise.
         """
+        doc, _ = await self._scrape_page(session, url, follow_links=False)
+        return doc
+        
+    async def _scrape_page(
+        self,
+        session: aiohttp.ClientSession,
+        url: str,
+        follow_links: bool,
+    ) -> tuple[Optional[ScrapedDocument], list[str]]:
+        """
+        Fetch a page once and extract both its content and its links.
+        
+        Args:
+            session: aiohttp client session.
+            url: URL to scrape.
+            follow_links: Whether to collect internal links.
+            
+        Returns:
+            The scraped document (or None) and the internal links found.
+        """
         try:
             logger.info("scraping_url", url=url)
             
-            async with session.get(url, timeout=30) as response:
+            async with session.get(url) as response:
                 if response.status != 200:
                     logger.warning(
                         "scrape_failed",
                         url=url,
                         status=response.status,
                     )
-                    return None
+                    return None, []
                     
                 html = await response.text()
                 
             # Parse HTML
-            soup = BeautifulSoup(html, "lxml")
+            tree = HTMLParser(html)
+            
+            # Links come first, since navigation is removed below
+            links = self._links_from_tree(tree, url) if follow_links else []
             
-            # Remove script and style elements
-            for element in soup(["script", "style", "nav", "footer", "header"]):
-                element.decompose()
+            # Remove script, style and page chrome
+            tree.strip_tags(_NON_CONTENT_TAGS)
             
             # Extract title
-            title = soup.title.string if soup.title else url
+            title_node = tree.css_first("title")
+            title = (title_node.text(strip=True) if title_node else "") or url
             
             # Extract main content
-            main_content = soup.find("main") or soup.find("article") or soup.body
+            main_content = tree.css_first("main") or tree.css_first("article") or tree.body
             
             if not main_content:
                 logger.warning("no_content_found", url=url)
-                return None
+                return None, links
                 
             # Clean text
-            text = main_content.get_text(separator="\n", strip=True)
+            text = main_content.text(separator="\n", strip=True)
             
-            # Remove excessive whitespace
-            lines = [line.strip() for line in text.splitlines() if line.strip()]
-            content = "\n".join(lines)
+            # Strip every line and drop blank ones in a single pass
+            content = _LINE_BREAK_PADDING.sub("\n", text).strip()
             
             if len(content) < 50:  # Skip pages with minimal content
                 logger.debug("content_too_short", url=url, length=len(content))
-                return None
+                return None, links
                 
             logger.info(
                 "scrape_success",
@@ -119,20 +234,21 @@ class WebScraper:
                 content_length=len(content),
             )
             
-            return ScrapedDocument(
+            doc = ScrapedDocument(
                 url=url,
-                title=str(title).strip(),
+                title=title,
                 content=content,
                 metadata={
                     "source": url,
-                    "title": str(title).strip(),
+                    "title": title,
                     "type": "webpage",
                 },
             )
+            return doc, links
             
         except Exception as e:
             logger.error("scrape_error", url=url, error=str(e))
-            return None
+            return None, []
             
     def extract_links(self, html: str, base_url: str) -> list[str]:
         """
@@ -145,21 +261,25 @@ class WebScraper:
         Returns:
             List of absolute URLs found in the page.
         """
-        soup = BeautifulSoup(html, "lxml")
-        links = []
+        return self._links_from_tree(HTMLParser(html), base_url)
+        
+    def _links_from_tree(self, tree: HTMLParser, base_url: str) -> list[str]:
+        """Collect internal links from an already parsed page."""
+        links = set()
         
-        for anchor in soup.find_all("a", href=True):
-            href = anchor["href"]
+        for anchor in tree.css("a[href]"):
+            href = anchor.attributes.get("href")
+            if not href:
+                continue
             absolute_url = urljoin(base_url, href)
             
             # Only include internal links
             if self.base_url and absolute_url.startswith(self.base_url):
                 # Remove fragments
                 parsed = urlparse(absolute_url)
-                clean_url = f"{parsed.scheme}://{parsed.netloc}{parsed.path}"
-                links.append(clean_url)
+                links.add(f"{parsed.scheme}://{parsed.netloc}{parsed.path}")
                 
-        return list(set(links))
+        return list(links)
         
     async def scrape_site(
         self,
@@ -176,43 +296,55 @@ class WebScraper:
         Returns:
             List of scraped documents.
         """
-        documents = []
-        urls_to_visit = [start_url]
+        documents: list[ScrapedDocument] = []
+        frontier = deque([start_url])
+        # Every URL ever queued, so a link found on many pages is queued once
+        queued = UrlSet([start_url])
+        in_flight = 0
+        changed = asyncio.Condition()
         
         if not self.base_url:
             parsed = urlparse(start_url)
             self.base_url = f"{parsed.scheme}://{parsed.netloc}"
             
-        async with aiohttp.ClientSession() as session:
-            while urls_to_visit and len(documents) < self.max_pages:
-                url = urls_to_visit.pop(0)
-                
-                if url in self.visited_urls:
-                    continue
+        session = self._get_session()
+        
+        async def worker() -> None:
+            nonlocal in_flight
+            while True:
+                async with changed:
+                    # Idle until there is work, or nothing in flight can add any
+                    while not frontier and in_flight and len(documents) < self.max_pages:
+                        await changed.wait()
+                    if not frontier or len(documents) >= self.max_pages:
+                        changed.notify_all()
+                        return
+                        
+                    url = frontier.popleft()
+                    if url in self.visited_urls:
+                        continue
+                    self.visited_urls.add(url)
+                    in_flight += 1
                     
-                self.visited_urls.add(url)
-                
-                doc = await self.scrape_url(session, url)
-                
-                if doc:
-                    documents.append(doc)
+                doc, new_links = None, []
+                try:
+                    await self._wait_for_host(url)
                     
-                    if follow_links:
-                        # Fetch HTML again to extract links
-                        try:
-                            async with session.get(url) as response:
-                                html = await response.text()
-                                new_links = self.extract_links(html, url)
-                                urls_to_visit.extend(
-                                    link for link in new_links
-                                    if link not in self.visited_urls
-                                )
-                        except Exception:
-                            pass
-                            
-                # Rate limiting
-                await asyncio.sleep(self.request_delay)
-                
+                    # Content and links come from the same response
+                    doc, new_links = await self._scrape_page(session, url, follow_links)
+                finally:
+                    async with changed:
+                        in_flight -= 1
+                        if doc and len(documents) < self.max_pages:
+                            documents.append(doc)
+                            for link in new_links:
+                                if link not in queued and link not in self.visited_urls:
+                                    queued.add(link)
+                                    frontier.append(link)
+                        changed.notify_all()
+                        
+        await asyncio.gather(*(worker() for _ in range(max(1, self.concurrency))))
+        
         logger.info(
             "scrape_complete",
             total_documents=len(documents),
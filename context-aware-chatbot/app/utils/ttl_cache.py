@@ -0,0 +1,79 @@
+"""
+Small in-process LRU cache with per-entry expiry.
+Used for chat-level caches that must not outlive knowledge base updates
+made by another process.
+"""
+
+import time
+from collections import OrderedDict
+from typing import Generic, Hashable, Optional, TypeVar
+
+T = TypeVar("T")
+
+
+class TTLCache(Generic[T]):
+    """
+    LRU cache whose entries expire after a fixed time.
+    
+    Features:
+    - O(1) get and set on an OrderedDict
+    - Expired entries are dropped when they are looked up or evicted
+    - Hit and miss counters for logging
+    
+    Not thread-safe; meant for use from a single event loop.
+    """
+    
+    def __init__(self, maxsize: int = 1024, ttl: float = 600.0):
+        """
+        Initialize the cache.
+        
+        Args:
+            maxsize: Maximum number of entries.
+            ttl: Seconds an entry stays valid.
+        """
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self._entries: OrderedDict[Hashable, tuple[float, T]] = OrderedDict()
+        
+    def __len__(self) -> int:
+        return len(self._entries)
+        
+    def get(self, key: Hashable) -> Optional[T]:
+        """
+        Look up a live entry.
+        
+        Args:
+            key: Cache key.
+            
+        Returns:
+            The cached value, or None if absent or expired.
+        """
+        entry = self._entries.get(key)
+        if entry is None or entry[0] <= time.monotonic():
+            if entry is not None:
+                del self._entries[key]
+            self.misses += 1
+            return None
+            
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return entry[1]
+        
+    def set(self, key: Hashable, value: T) -> None:
+        """
+        Store a value, evicting the least recently used entry if full.
+        
+        Args:
+            key: Cache key.
+            value: Value to cache.
+        """
+        self._entries[key] = (time.monotonic() + self.ttl, value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.maxsize:
+            self._entries.popitem(last=False)
+            
+    def clear(self) -> None:
+        """Drop every entry."""
+        self._entries.clear()
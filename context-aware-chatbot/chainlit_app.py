@@ -3,13 +3,23 @@ Chainlit chat interface for the RAG chatbot.
 Provides a beautiful, interactive chat UI with streaming responses.
 """
 
+import asyncio
+import hashlib
+import time
+from functools import lru_cache
+from typing import Optional
+
 import chainlit as cl
 from chainlit.input_widget import Select, Slider
 
 from app.config import get_settings
-from app.services.rag_pipeline import RAGPipeline
-from app.services.vector_store import VectorStoreService
+from app.models.fast_schemas import SourceDocumentFast
+from app.services.cache_store import DiskCache
+from app.services.rag_pipeline import STREAM_ERROR_PREFIX
+from app.services.semantic_cache import SemanticCache
+from app.services.singletons import get_rag_pipeline, get_vector_store
 from app.utils.logging import get_logger, setup_logging
+from app.utils.ttl_cache import TTLCache
 
 # Initialize logging
 setup_logging()
@@ -18,6 +28,138 @@ logger = get_logger(__name__)
 # Initialize services
 settings = get_settings()
 
+# Finished answers by normalized question and top_k, shared by all sessions.
+# Entries expire because ingestion runs in the API process, out of reach
+# of this cache.
+_RESPONSE_CACHE: TTLCache[tuple[str, list[SourceDocumentFast]]] = TTLCache(
+    maxsize=settings.chat_cache_size,
+    ttl=settings.chat_cache_ttl,
+)
+
+# Retrieved documents by question and top_k, so a question whose answer
+# wasn't cached (or failed to generate) doesn't repeat the embedding and
+# vector search
+_RETRIEVAL_CACHE: TTLCache[list[dict]] = TTLCache(
+    maxsize=4096,
+    ttl=settings.chat_cache_ttl,
+)
+
+# Knowledge base stats shown at session start and by the stats action.
+# Counted exactly, at most once per TTL, so the number tracks ingestion done
+# by the API process without a collection query per session
+_STATS_CACHE: TTLCache[dict] = TTLCache(maxsize=1, ttl=30.0)
+
+# Streamed tokens are sent to the browser in batches of at least this many
+# characters, or after this many seconds, rather than one frame per token
+_STREAM_FLUSH_CHARS = 48
+_STREAM_FLUSH_INTERVAL = 0.025
+
+
+def _response_cache_key(question: str, top_k: int) -> str:
+    """Key answers on the case-folded question and the number of sources."""
+    return hashlib.sha256(f"{question.lower()}|{top_k}".encode()).hexdigest()
+
+
+async def _cached_stats() -> dict:
+    """Get vector store stats, refreshing them in a thread once the cached copy expires."""
+    stats = _STATS_CACHE.get("stats")
+    if stats is None:
+        stats = await asyncio.to_thread(get_vector_store().get_stats, exact=True)
+        _STATS_CACHE.set("stats", stats)
+    return stats
+
+
+def _format_sources_block(sources: list[SourceDocumentFast]) -> str:
+    """
+    Render sources as the Markdown block shown after an answer.
+    
+    Args:
+        sources: Sources of the answer, most relevant first.
+        
+    Returns:
+        Markdown text with a short preview of each source.
+    """
+    parts = ["\n\n---\n\n📚 **Sources:**\n\n"]
+    
+    for i, source in enumerate(sources, 1):
+        # Truncate content for display
+        content = source.content
+        preview = content[:200] + "..." if len(content) > 200 else content
+        
+        parts.append(
+            f"**{i}. {source.title or 'Untitled'}** (relevance: {source.relevance_score:.2%})\n"
+            f"> {preview}\n"
+            f"> *Source: {source.source}*\n\n"
+        )
+        
+    return "".join(parts)
+
+
+@lru_cache(maxsize=16)
+def _welcome_message(doc_count: int) -> str:
+    """Render the welcome message; only the document count varies."""
+    return f"""👋 **Welcome to the Company Knowledge Assistant!**
+
+I'm here to help you find information from our internal documentation. I have access to **{doc_count}** indexed document chunks.
+
+**How to use me:**
+- Ask any question about company policies, procedures, or documentation
+- I'll search our knowledge base and provide answers with source citations
+- Use the settings (⚙️) to customize how many sources I retrieve
+
+**Examples of questions you can ask:**
+- "What is our remote work policy?"
+- "How do I request time off?"
+- "What are the security guidelines for handling customer data?"
+
+Let me know how I can help! 🚀"""
+
+
+@lru_cache(maxsize=1)
+def _get_response_store() -> Optional[DiskCache[tuple[int, str, list[SourceDocumentFast]]]]:
+    """
+    Get the on-disk copy of cached answers, as (top_k, answer, sources).
+    Backs the in-memory caches so answers survive a restart. Returns None
+    when chat caching or persistence is disabled.
+    """
+    if not (settings.chat_cache_enabled and settings.chat_cache_persist):
+        return None
+    return DiskCache(
+        settings.chat_cache_path,
+        tuple[int, str, list[SourceDocumentFast]],
+        ttl=settings.chat_cache_ttl,
+        max_size=settings.chat_cache_size,
+    )
+
+
+@lru_cache(maxsize=16)
+def _get_semantic_cache(top_k: int) -> Optional[SemanticCache[tuple[str, list[SourceDocumentFast]]]]:
+    """
+    Get the cache of answers given with top_k sources, keyed by question
+    embedding. Catches paraphrases the exact cache misses. Starts with the
+    answers kept on disk. Returns None when semantic caching is disabled.
+    """
+    if not (settings.chat_cache_enabled and settings.semantic_cache_enabled):
+        return None
+        
+    dimension = get_vector_store().embedding_dimension
+    cache = SemanticCache(
+        dimension,
+        max_size=settings.chat_cache_size,
+        threshold=settings.semantic_cache_threshold,
+        int8=settings.semantic_cache_int8,
+        ttl=settings.chat_cache_ttl,
+    )
+    
+    store = _get_response_store()
+    if store is not None:
+        for embedding, remaining, (stored_top_k, full_response, sources) in store.embedded_items():
+            # Skip vectors from a previously configured embedding model
+            if stored_top_k == top_k and len(embedding) == dimension:
+                cache.put(embedding, (full_response, sources), ttl=remaining)
+                
+    return cache
+
 
 @cl.on_chat_start
 async def on_chat_start():
@@ -27,14 +169,13 @@ async def on_chat_start():
     """
     logger.info("chat_session_started")
     
-    # Initialize RAG pipeline for this session
+    # Build the shared pipeline on the first session; the session itself
+    # only holds per-user settings
     try:
-        rag_pipeline = RAGPipeline()
-        cl.user_session.set("rag_pipeline", rag_pipeline)
+        await asyncio.to_thread(get_rag_pipeline)
         
         # Get collection stats
-        vector_store = VectorStoreService()
-        stats = vector_store.get_stats()
+        stats = await _cached_stats()
         doc_count = stats.get("document_count", 0)
         
         # Settings for the session
@@ -62,23 +203,7 @@ async def on_chat_start():
         cl.user_session.set("show_sources", True)
         
         # Send welcome message
-        welcome_message = f"""👋 **Welcome to the Company Knowledge Assistant!**
-
-I'm here to help you find information from our internal documentation. I have access to **{doc_count}** indexed document chunks.
-
-**How to use me:**
-- Ask any question about company policies, procedures, or documentation
-- I'll search our knowledge base and provide answers with source citations
-- Use the settings (⚙️) to customize how many sources I retrieve
-
-**Examples of questions you can ask:**
-- "What is our remote work policy?"
-- "How do I request time off?"
-- "What are the security guidelines for handling customer data?"
-
-Let me know how I can help! 🚀"""
-
-        await cl.Message(content=welcome_message).send()
+        await cl.Message(content=_welcome_message(doc_count)).send()
         
     except Exception as e:
         logger.error("session_init_error", error=str(e))
@@ -117,60 +242,109 @@ async def on_message(message: cl.Message):
     logger.info("user_message_received", question=question[:100])
     
     # Get session settings
-    rag_pipeline: RAGPipeline = cl.user_session.get("rag_pipeline")
     top_k = cl.user_session.get("top_k", settings.retrieval_top_k)
     show_sources = cl.user_session.get("show_sources", True)
     
-    if not rag_pipeline:
-        await cl.Message(
-            content="⚠️ Session not initialized. Please refresh the page."
-        ).send()
-        return
-    
     # Create a message for streaming the response
     response_message = cl.Message(content="")
     await response_message.send()
     
     try:
-        # Get sources first (for display alongside response)
-        sources = rag_pipeline.get_retrieved_sources(question, top_k)
+        rag_pipeline = get_rag_pipeline()
+        cache_key = _response_cache_key(question, top_k)
+        cached = _RESPONSE_CACHE.get(cache_key) if settings.chat_cache_enabled else None
         
-        if not sources:
-            await response_message.stream_token(
-                "I couldn't find any relevant information in my knowledge base to answer your question. "
-                "Please try rephrasing or ask about a different topic."
-            )
-            await response_message.update()
-            return
-            
-        # Stream the response
-        full_response = ""
-        async for chunk in rag_pipeline.stream_query(question, top_k):
-            full_response += chunk
-            await response_message.stream_token(chunk)
+        # Then answers given before the last restart. SQLite and building
+        # the semantic cache block, so they run off the event loop.
+        response_store = await asyncio.to_thread(_get_response_store)
+        if cached is None and response_store is not None:
+            stored = await asyncio.to_thread(response_store.get, cache_key)
+            if stored is not None:
+                cached = stored[1:]
+                _RESPONSE_CACHE.set(cache_key, cached)
+                
+        # Fall back to the nearest previously answered question
+        semantic_cache = await asyncio.to_thread(_get_semantic_cache, top_k)
+        query_embedding = None
+        if cached is None and semantic_cache is not None:
+            query_embedding = await get_vector_store().aembed(question)
+            cached = semantic_cache.get(query_embedding)
+            if cached is not None:
+                logger.info("semantic_cache_hit", question=question[:100])
+                
+        if cached is not None:
+            # Replay the whole answer in one update
+            full_response, sources = cached
+            await response_message.stream_token(full_response)
             
-        await response_message.update()
-        
-        # Show sources if enabled
-        if show_sources and sources:
-            sources_text = "\n\n---\n\n📚 **Sources:**\n\n"
+            logger.info("cache_stats", hit=True, hits=_RESPONSE_CACHE.hits, misses=_RESPONSE_CACHE.misses)
+        else:
+            # Retrieve once; the same documents feed the prompt and the
+            # sources shown alongside the response
+            retrieval_key = (question, top_k)
+            documents = _RETRIEVAL_CACHE.get(retrieval_key) if settings.chat_cache_enabled else None
+            if documents is None:
+                # Have Ollama load the model while the vector search runs
+                documents, _ = await asyncio.gather(
+                    rag_pipeline.aretrieve(question, top_k, query_embedding=query_embedding),
+                    rag_pipeline.prewarm_llm(),
+                )
+                if settings.chat_cache_enabled and documents:
+                    _RETRIEVAL_CACHE.set(retrieval_key, documents)
+            sources = rag_pipeline.format_sources(documents)
             
-            for i, source in enumerate(sources, 1):
-                title = source.title or "Untitled"
-                score = source.relevance_score
-                source_url = source.source
+            if not sources:
+                await response_message.stream_token(
+                    "I couldn't find any relevant information in my knowledge base to answer your question. "
+                    "Please try rephrasing or ask about a different topic."
+                )
+                await response_message.update()
+                return
                 
-                # Truncate content for display
-                content_preview = source.content[:200] + "..." if len(source.content) > 200 else source.content
-                
-                sources_text += f"""**{i}. {title}** (relevance: {score:.2%})
-> {content_preview}
-> *Source: {source_url}*
-
-"""
+            # Stream the response, coalescing tokens into fewer websocket frames
+            parts: list[str] = []
+            pending: list[str] = []
+            pending_chars = 0
+            last_flush = time.monotonic()
+            async for chunk in rag_pipeline.stream_query(question, top_k, documents=documents):
+                parts.append(chunk)
+                pending.append(chunk)
+                pending_chars += len(chunk)
+                now = time.monotonic()
+                if pending_chars >= _STREAM_FLUSH_CHARS or now - last_flush >= _STREAM_FLUSH_INTERVAL:
+                    await response_message.stream_token("".join(pending))
+                    pending.clear()
+                    pending_chars = 0
+                    last_flush = now
+                    
+            if pending:
+                await response_message.stream_token("".join(pending))
+            full_response = "".join(parts)
+            
+            # Failed generations are not worth replaying
+            if settings.chat_cache_enabled and full_response and STREAM_ERROR_PREFIX not in full_response:
+                _RESPONSE_CACHE.set(cache_key, (full_response, sources))
+                if response_store is not None:
+                    await asyncio.to_thread(
+                        response_store.set,
+                        cache_key,
+                        (top_k, full_response, sources),
+                        embedding=query_embedding,
+                    )
+                if query_embedding is not None:
+                    semantic_cache.put(query_embedding, (full_response, sources))
+                    
+            logger.info("cache_stats", hit=False, hits=_RESPONSE_CACHE.hits, misses=_RESPONSE_CACHE.misses)
             
-            # Create a separate message for sources
-            await cl.Message(content=sources_text).send()
+        # Finalize the answer and send sources, if enabled, as a separate
+        # message; neither round trip waits for the other
+        if show_sources and sources:
+            await asyncio.gather(
+                response_message.update(),
+                cl.Message(content=_format_sources_block(sources)).send(),
+            )
+        else:
+            await response_message.update()
             
         logger.info(
             "response_sent",
@@ -223,8 +397,7 @@ async def on_clear_chat(action: cl.Action):
 async def on_show_stats(action: cl.Action):
     """Show vector store statistics."""
     try:
-        vector_store = VectorStoreService()
-        stats = vector_store.get_stats()
+        stats = await _cached_stats()
         
         stats_message = f"""📊 **Knowledge Base Statistics**
 
@@ -5,11 +5,7 @@ Provides commands to start the API, chat UI, or ingest documents.
 """
 
 import argparse
-import asyncio
-import subprocess
 import sys
-import os
-from pathlib import Path
 
 # Fix Windows console encoding for Unicode
 if sys.platform == "win32":
@@ -20,22 +16,29 @@ def run_api(host: str = "0.0.0.0", port: int = 8000, reload: bool = True):
     print(f"[*] Starting API server at http://{host}:{port}")
     print(f"[*] API docs available at http://{host}:{port}/docs")
     
-    cmd = [
-        sys.executable, "-m", "uvicorn",
-        "app.main:app",
-        "--host", host,
-        "--port", str(port),
-    ]
+    # Run uvicorn in this process rather than starting a second interpreter
+    import uvicorn
+    from app.config import get_settings
     
-    if reload:
-        cmd.append("--reload")
-        
-    subprocess.run(cmd)
+    uvicorn.run(
+        "app.main:app",
+        host=host,
+        port=port,
+        reload=reload,
+        workers=1 if reload else get_settings().workers,  # The reloader runs a single worker
+        loop="asyncio" if sys.platform == "win32" else "uvloop",  # uvloop has no Windows build
+        http="httptools",
+        backlog=2048,
+        log_config=None,  # Logging is configured by setup_logging()
+    )
 
 
 def run_chat():
     """Start the Chainlit chat interface."""
     print("[*] Starting Chainlit chat interface...")
+    
+    import subprocess
+    
     subprocess.run([sys.executable, "-m", "chainlit", "run", "chainlit_app.py"])
 
 
@@ -44,6 +47,8 @@ def ingest_docs(source: str, source_type: str = "directory", follow_links: bool
     print(f"[*] Ingesting documents from: {source}")
     
     # Import here to avoid slow startup for other commands
+    import asyncio
+    
     from app.services.ingestion import IngestionService
     from app.models.schemas import IngestType
     from app.utils.logging import setup_logging
@@ -66,12 +71,19 @@ def ingest_docs(source: str, source_type: str = "directory", follow_links: bool
         print(f"        Valid types: {', '.join(type_map.keys())}")
         sys.exit(1)
     
+    async def run_ingest() -> dict:
+        # Close the scraper's session on the same loop that opened it
+        try:
+            return await service.ingest(
+                ingest_type=ingest_type,
+                source=source,
+                follow_links=follow_links,
+            )
+        finally:
+            await service.aclose()
+            
     # Run ingestion
-    result = asyncio.run(service.ingest(
-        ingest_type=ingest_type,
-        source=source,
-        follow_links=follow_links,
-    ))
+    result = asyncio.run(run_ingest())
     
     if result["success"]:
         print(f"[OK] Ingestion complete!")
@@ -88,17 +100,25 @@ def check_ollama():
     
     try:
         import httpx
+        import orjson
         from app.config import get_settings
         
         settings = get_settings()
-        response = httpx.get(f"{settings.ollama_base_url}/api/tags", timeout=5)
         
+        # Fail fast: a local Ollama answers well within these limits
+        with httpx.Client(
+            base_url=settings.ollama_base_url,
+            timeout=httpx.Timeout(3.0, connect=1.0),
+            transport=httpx.HTTPTransport(retries=0),
+        ) as client:
+            response = client.get("/api/tags")
+            
         if response.status_code == 200:
-            models = response.json().get("models", [])
-            model_names = [m["name"].split(":")[0] for m in models]
+            models = orjson.loads(response.content).get("models", [])
+            model_names = {m["name"].split(":", 1)[0] for m in models}
             
             print(f"[OK] Ollama is running")
-            print(f"     Available models: {', '.join(model_names) or 'None'}")
+            print(f"     Available models: {', '.join(sorted(model_names)) or 'None'}")
             
             if settings.ollama_model not in model_names:
                 print(f"[WARN] Required model '{settings.ollama_model}' not found")